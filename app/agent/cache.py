@@ -0,0 +1,136 @@
+"""
+cache.py
+--------
+Semantic response cache for the AI-Bike-Coach chat agent.
+
+Responsibilities:
+- Embed incoming questions and find near-duplicate past questions in a RediSearch HNSW index.
+- Store agent answers, and the SQL the agent ran for them, with a TTL so repeated questions
+  skip the LLM and SQL round-trips.
+- Fail open: if Redis or the embedding call is unavailable, the agent runs as usual.
+"""
+
+import logging
+import uuid
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from langchain.embeddings import OpenAIEmbeddings
+from redis.commands.search.field import TextField, VectorField
+try:
+    from redis.commands.search.index_definition import IndexDefinition, IndexType
+except ImportError:  # redis-py < 6
+    from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+from redis.exceptions import RedisError, ResponseError
+
+from app.db.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "qcache"
+KEY_PREFIX = "qcache:"
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+MAX_DISTANCE = 0.05  # cosine distance, i.e. similarity above 0.95
+TTL_SECONDS = 86400
+
+@lru_cache(maxsize=1)
+def _embeddings() -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL)
+
+def _ensure_index() -> bool:
+    """
+    Create the vector index if it doesn't exist. Returns False if RediSearch is unavailable.
+    """
+    index = redis_client.ft(INDEX_NAME)
+    try:
+        index.info()
+        return True
+    except ResponseError:
+        pass
+    try:
+        index.create_index(
+            [
+                TextField("query"),
+                TextField("response"),
+                VectorField("vec", "HNSW", {
+                    "TYPE": "FLOAT32",
+                    "DIM": EMBEDDING_DIM,
+                    "DISTANCE_METRIC": "COSINE",
+                }),
+            ],
+            definition=IndexDefinition(prefix=[KEY_PREFIX], index_type=IndexType.HASH),
+        )
+        return True
+    except ResponseError as e:
+        if "already exists" in str(e):  # created by a concurrent first request
+            return True
+        logger.warning(f"Semantic cache disabled, could not create index: {e}")
+        return False
+    except RedisError as e:
+        logger.warning(f"Semantic cache disabled, could not create index: {e}")
+        return False
+
+@lru_cache(maxsize=1)
+def _enabled() -> bool:
+    """
+    Whether the cache is usable; the index is checked/created on the first question, not at import.
+    """
+    try:
+        return _ensure_index()
+    except RedisError as e:
+        logger.warning(f"Semantic cache disabled, Redis unavailable: {e}")
+        return False
+
+def embed(query: str) -> Optional[bytes]:
+    """
+    Embed a question as float32 bytes, or None if the cache is disabled or embedding fails.
+    """
+    if not _enabled():
+        return None
+    try:
+        return np.asarray(_embeddings().embed_query(query), dtype=np.float32).tobytes()
+    except Exception as e:
+        logger.warning(f"Semantic cache embedding failed: {e}")
+        return None
+
+def lookup(vec: Optional[bytes]) -> Optional[str]:
+    """
+    Return the cached answer for the nearest stored question within MAX_DISTANCE.
+    """
+    if vec is None:
+        return None
+    query = (
+        Query("*=>[KNN 1 @vec $vec AS dist]")
+        .sort_by("dist")
+        .return_fields("response", "dist")
+        .dialect(2)
+    )
+    try:
+        result = redis_client.ft(INDEX_NAME).search(query, query_params={"vec": vec})
+    except RedisError as e:
+        logger.warning(f"Semantic cache lookup failed: {e}")
+        return None
+    if result.docs and float(result.docs[0].dist) < MAX_DISTANCE:
+        response = result.docs[0].response
+        return response.decode() if isinstance(response, bytes) else response
+    return None
+
+def store(vec: Optional[bytes], query: str, response: str, sql_executed: str = "") -> None:
+    """
+    Cache an answer, with the SQL executed to produce it, under its question embedding for TTL_SECONDS.
+    """
+    if vec is None:
+        return
+    key = f"{KEY_PREFIX}{uuid.uuid4().hex}"
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(key, mapping={
+            "vec": vec, "query": query, "response": response, "sql_executed": sql_executed,
+        })
+        pipe.expire(key, TTL_SECONDS)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Semantic cache store failed: {e}")
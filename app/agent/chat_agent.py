@@ -5,7 +5,8 @@ LangChain-powered chat agent for the AI-Bike-Coach platform.
 
 Responsibilities:
 - Initialize a LangChain agent with SQLDatabase tools and OpenAI LLM.
-- Provide an answer(query) function for natural language queries over the database.
+- Provide an async answer(query) generator that streams the agent's reply token by token.
+- Serve repeated questions from the semantic cache in front of the agent.
 - Used by the Streamlit Chat UI and potentially other interfaces.
 
 TODO:
@@ -14,17 +15,52 @@ TODO:
 - Support more advanced agent tools (analytics, recommendations, etc.).
 """
 
+import asyncio
+from functools import lru_cache
+from typing import AsyncIterator
 from langchain.agents import initialize_agent
 from langchain.chat_models import ChatOpenAI
-from .tools import sql_toolkit
+from . import cache
+from .tools import get_tools
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
-agent = initialize_agent(
-    tools=sql_toolkit.get_tools(),
-    llm=llm,
-    agent_type="openai-tools",
-    verbose=True,
-)
+@lru_cache(maxsize=1)
+def get_agent():
+    """
+    The agent, built on the first question rather than at import: its tools reflect the
+    database, so building it eagerly would make API startup depend on Postgres and OpenAI.
+    """
+    llm = ChatOpenAI(model="gpt-4o", temperature=0, streaming=True)
+    return initialize_agent(
+        tools=get_tools(),
+        llm=llm,
+        agent_type="openai-tools",
+        verbose=True,
+    )
 
-def answer(query:str)->str:
-    return agent.run(query)
\ No newline at end of file
+async def answer(query:str)->AsyncIterator[str]:
+    """
+    Stream the answer to `query` as text chunks, so the first tokens reach the client
+    while the agent is still generating. Cache hits are yielded in one piece.
+    """
+    vec = await asyncio.to_thread(cache.embed, query)
+    cached = await asyncio.to_thread(cache.lookup, vec)
+    if cached is not None:
+        yield cached
+        return
+    agent = await asyncio.to_thread(get_agent)
+    parts = []
+    sql_executed = []
+    async for event in agent.astream_events({"input": query}, version="v1"):
+        if event["event"] == "on_tool_start" and event["name"] == "sql_db_query":
+            tool_input = event["data"].get("input")
+            sql_executed.append(tool_input.get("query", "") if isinstance(tool_input, dict) else str(tool_input))
+            continue
+        if event["event"] != "on_chat_model_stream":
+            continue
+        # Tool-calling turns stream empty content; only the final reply carries text
+        text = event["data"]["chunk"].content
+        if text:
+            parts.append(text)
+            yield text
+    if parts:
+        await asyncio.to_thread(cache.store, vec, query, "".join(parts), ";\n".join(sql_executed))
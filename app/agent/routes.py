@@ -0,0 +1,45 @@
+"""
+routes.py
+---------
+API routes for the AI-Bike-Coach chat agent.
+
+Responsibilities:
+- Expose the LangChain SQL agent over HTTP.
+- Stream the agent's reply as Server-Sent Events so clients can render tokens as they arrive.
+"""
+
+import logging
+import orjson
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.agent.chat_agent import answer
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+class ChatRequest(BaseModel):
+    query: str
+
+
+async def _iter_sse(query: str):
+    # One SSE event per text chunk; JSON-encode so newlines inside a chunk survive framing
+    try:
+        async for chunk in answer(query):
+            yield b"data: " + orjson.dumps(chunk) + b"\n\n"
+    except Exception as e:
+        logger.error(f"Chat agent failed for query {query!r}: {e}")
+        yield b"event: error\ndata: " + orjson.dumps(str(e)) + b"\n\n"
+    yield b"event: done\ndata: null\n\n"
+
+
+@router.post("/chat")
+async def chat(request: ChatRequest):
+    """
+    Answer a natural-language question about the user's rides, streamed as text/event-stream
+    """
+    return StreamingResponse(
+        _iter_sse(request.query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -4,7 +4,7 @@ tools.py
 LangChain SQLDatabase toolkit and helpers for the AI-Bike-Coach agent.
 
 Responsibilities:
-- Initialize SQLDatabase connection using app settings.
+- Lazily initialize the SQLDatabase connection using app settings.
 - Provide a SQLDatabaseToolkit instance for use by the chat agent.
 - Encapsulate DB tool logic for agent extensibility.
 
@@ -13,8 +13,53 @@ TODO:
 - Add error handling and logging for DB operations.
 """
 
+from functools import lru_cache
 from langchain.tools import SQLDatabaseToolkit
+from langchain.tools.sql_database.tool import InfoSQLDatabaseTool
 from langchain.sql_database import SQLDatabase
 from app.config import settings
-db = SQLDatabase.from_uri(settings.DATABASE_URL)
-sql_toolkit = SQLDatabaseToolkit(db=db)
\ No newline at end of file
+
+# Tables the agent may query
+AGENT_TABLES = ["users", "activities", "streams", "pr_records", "pmc_daily"]
+
+@lru_cache(maxsize=1)
+def get_db() -> SQLDatabase:
+    """
+    Agent database handle, connected on first use so importing the API needs no database.
+    """
+    return SQLDatabase.from_uri(
+        settings.DATABASE_URL,
+        include_tables=AGENT_TABLES,
+        sample_rows_in_table_info=2,
+        view_support=False,
+    )
+
+@lru_cache(maxsize=1)
+def _table_info() -> dict:
+    # Schema + sample rows per table, introspected once on first use rather than on every agent step
+    db = get_db()
+    return {table: db.get_table_info([table]) for table in db.get_usable_table_names()}
+
+class CachedInfoSQLDatabaseTool(InfoSQLDatabaseTool):
+    """
+    InfoSQLDatabaseTool that answers from the cached schema introspection.
+    """
+    def _run(self, table_names: str, run_manager=None) -> str:
+        table_info = _table_info()
+        names = [name.strip() for name in table_names.split(",")]
+        missing = [name for name in names if name not in table_info]
+        if missing:
+            return f"Error: table_names {set(missing)} not found in database"
+        return "\n\n".join(table_info[name] for name in names)
+
+@lru_cache(maxsize=1)
+def get_tools():
+    """
+    Toolkit tools with the schema tool swapped for the cached variant.
+    Built once, on the first agent request; the tool list is pure given the database.
+    """
+    db = get_db()
+    return [
+        CachedInfoSQLDatabaseTool(db=db) if isinstance(tool, InfoSQLDatabaseTool) else tool
+        for tool in SQLDatabaseToolkit(db=db).get_tools()
+    ]
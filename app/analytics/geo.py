@@ -0,0 +1,73 @@
+"""
+geo.py
+------
+GPS geometry helpers for the AI-Bike-Coach platform.
+
+Responsibilities:
+- Compute great-circle (haversine) distances along a ride's lat/lon track.
+- Called from the Strava ingest path to derive the cumulative distance stream.
+"""
+
+import math
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the NumPy expression below covers every case
+    njit = None
+
+EARTH_RADIUS_M = 6_371_000.0
+NUMBA_MIN_POINTS = 5000  # below this the NumPy version is already fast enough
+
+
+if njit is not None:
+    # No fastmath: it lets LLVM assume no NaNs, and GPS gaps must stay NaN
+    @njit(cache=True)
+    def _haversine_fused(lat, lon, seg):
+        # One pass over the track; no temporaries for each trig term
+        for i in range(1, lat.size):
+            s_lat = math.sin((lat[i] - lat[i - 1]) / 2)
+            s_lon = math.sin((lon[i] - lon[i - 1]) / 2)
+            a = s_lat * s_lat + math.cos(lat[i - 1]) * math.cos(lat[i]) * s_lon * s_lon
+            seg[i] = 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+    _haversine_fused(np.zeros(2), np.zeros(2), np.zeros(2))  # compile at import rather than on the first ride
+else:
+    _haversine_fused = None
+
+
+def _haversine(lat, lon):
+    # Distances between consecutive radian fixes (first entry 0); inputs must be gap-free
+    seg = np.zeros(lat.size)
+    if lat.size < 2:
+        return seg
+    if _haversine_fused is not None and lat.size >= NUMBA_MIN_POINTS:
+        _haversine_fused(lat, lon, seg)
+        return seg
+    a = (np.sin(np.diff(lat) / 2) ** 2
+         + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2)
+    seg[1:] = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+    return seg
+
+
+def segment_distances(lat, lon):
+    """
+    Haversine distance in metres from each fix to the previous valid fix (first valid fix 0).
+    Missing fixes come out as NaN; the distance across a dropout lands on the fix after it.
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    if valid.all():
+        return _haversine(lat, lon)
+    seg = np.full(lat.size, np.nan)
+    seg[valid] = _haversine(lat[valid], lon[valid])
+    return seg
+
+
+def cumulative_distance(lat, lon):
+    """
+    Distance travelled in metres at each sample; samples inside a GPS gap hold the distance
+    at the last fix, and the gap is bridged by the straight line to the next one.
+    """
+    return np.cumsum(np.nan_to_num(segment_distances(lat, lon)))
@@ -13,31 +13,164 @@ TODO:
 - Optimize for large user/activity datasets.
 """
 
+import datetime as dt
+import logging
 import numpy as np
 import pandas as pd
-from celery import Celery
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from scipy.signal import lfilter
+from app.celery_app import celery
 from app.db.session import SessionLocal
-from app.db.models import Activity, User
+from app.db.models import PMCDaily
 
-celery = Celery(__name__, broker="redis://redis:6379/0")
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; fall back to SciPy's IIR filter
+    njit = None
 
-def calc_ctl_atl(tss_series: pd.Series, tau:int):
-    # simple EWMA implementation
-    return tss_series.ewm(alpha=1/tau, adjust=False).mean()
+logger = logging.getLogger(__name__)
+
+
+def _ewma_lfilter(x, alpha, y0):
+    # Same recursion expressed as a first-order IIR filter; the initial state carries the seed
+    if x.size == 0:
+        return np.empty_like(x)
+    y, _ = lfilter([alpha], [1.0, -(1.0 - alpha)], x, zi=[y0 * (1.0 - alpha)])
+    return y
+
+def _pmc_lfilter(x, a_ctl, a_atl, ctl0, atl0):
+    ctl = _ewma_lfilter(x, a_ctl, ctl0)
+    atl = _ewma_lfilter(x, a_atl, atl0)
+    tsb = np.empty_like(x)
+    if x.size:
+        tsb[0] = ctl0 - atl0
+        tsb[1:] = ctl[:-1] - atl[:-1]
+    return ctl, atl, tsb
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _ewma(x, alpha, y0):
+        # y[i] = y[i-1] + alpha * (x[i] - y[i-1]), with y[-1] = y0
+        y = np.empty_like(x)
+        prev = y0
+        for i in range(x.size):
+            prev = prev + alpha * (x[i] - prev)
+            y[i] = prev
+        return y
+
+    @njit(cache=True, fastmath=True)
+    def _pmc(x, a_ctl, a_atl, ctl0, atl0):
+        # CTL, ATL and TSB in one sweep; TSB is yesterday's fitness minus yesterday's fatigue
+        ctl = np.empty_like(x)
+        atl = np.empty_like(x)
+        tsb = np.empty_like(x)
+        prev_ctl = ctl0
+        prev_atl = atl0
+        for i in range(x.size):
+            tsb[i] = prev_ctl - prev_atl
+            prev_ctl = prev_ctl + a_ctl * (x[i] - prev_ctl)
+            prev_atl = prev_atl + a_atl * (x[i] - prev_atl)
+            ctl[i] = prev_ctl
+            atl[i] = prev_atl
+        return ctl, atl, tsb
+
+    # Compile (or load from the on-disk cache) at import so the first task doesn't pay for it
+    _ewma(np.zeros(2, dtype=np.float64), 0.5, 0.0)
+    _pmc(np.zeros(2, dtype=np.float64), 0.5, 0.5, 0.0, 0.0)
+else:
+    _ewma = _ewma_lfilter
+    _pmc = _pmc_lfilter
+
+def calc_ctl_atl(tss_series: pd.Series, tau:int, seed:float=0.0):
+    # EWMA with alpha = 1/tau starting from `seed` (the load the day before the series starts).
+    # With seed equal to the first value this matches tss_series.ewm(alpha=1/tau, adjust=False).mean()
+    x = tss_series.to_numpy(dtype=np.float64, copy=False)
+    return pd.Series(_ewma(x, 1.0 / tau, float(seed)), index=tss_series.index)
+
+def calc_pmc(tss_series: pd.Series, ctl_tau:int=42, atl_tau:int=7,
+             ctl0:float=0.0, atl0:float=0.0) -> pd.DataFrame:
+    """
+    Compute CTL, ATL and TSB from a daily TSS series in a single pass.
+    Loads start from ctl0/atl0 (default 0, i.e. no training before the first day).
+    Returns a DataFrame indexed like tss_series with columns ctl, atl, tsb.
+    """
+    x = tss_series.to_numpy(dtype=np.float64, copy=False)
+    ctl, atl, tsb = _pmc(x, 1.0 / ctl_tau, 1.0 / atl_tau, float(ctl0), float(atl0))
+    return pd.DataFrame({"ctl": ctl, "atl": atl, "tsb": tsb}, index=tss_series.index)
+
+def load_daily_tss(db: Session, user_id:str) -> pd.Series:
+    """
+    Sum TSS per calendar day for a user, with rest days filled in as zero.
+    Returns an empty Series if the user has no activities.
+    """
+    rows = db.execute(
+        text(
+            "SELECT date(start_time) AS d, COALESCE(SUM(tss), 0) AS tss "
+            "FROM activities WHERE user_id = :u AND start_time IS NOT NULL "
+            "GROUP BY d ORDER BY d"
+        ),
+        {"u": user_id},
+    ).all()
+    if not rows:
+        return pd.Series(dtype=np.float64)
+    
+    days, tss = zip(*rows)
+    daily = pd.Series(np.asarray(tss, dtype=np.float64), index=pd.DatetimeIndex(days))
+    end = max(daily.index[-1], pd.Timestamp(dt.date.today()))
+    return daily.reindex(pd.date_range(daily.index[0], end, freq="D"), fill_value=0.0)
+
+def upsert_pmc_daily(db: Session, user_id:str, daily_tss: pd.Series, pmc: pd.DataFrame):
+    """
+    Write the daily PMC snapshot for a user as one batched INSERT ... ON CONFLICT DO UPDATE.
+    """
+    rows = [
+        {"user_id": user_id, "date": d, "tss": tss, "ctl": ctl, "atl": atl, "tsb": tsb}
+        for d, tss, ctl, atl, tsb in zip(
+            pmc.index.date,
+            daily_tss.tolist(),
+            pmc["ctl"].tolist(),
+            pmc["atl"].tolist(),
+            pmc["tsb"].tolist(),
+        )
+    ]
+    stmt = pg_insert(PMCDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PMCDaily.user_id, PMCDaily.date],
+        set_={
+            "tss": stmt.excluded.tss,
+            "ctl": stmt.excluded.ctl,
+            "atl": stmt.excluded.atl,
+            "tsb": stmt.excluded.tsb,
+        },
+    )
+    db.execute(stmt, rows)
 
 @celery.task
-def recalc_metrics_for_activity(user_id:str, strava_activity_id:int):
+def recalc_metrics_for_user(user_id:str):
     """
-    Rebuild CTL/ATL/TSB for the user of this activity.
-    Called after new ride ingested.
+    Rebuild CTL/ATL/TSB for a user's whole history.
+    Runs once at the end of an initial sync, after all of its rides are stored.
     """
     db = SessionLocal()
     try:
-        # This is a stub implementation for Phase 0.1
-        # In future phases, we'll:
-        # 1. Pull all activities with date and TSS for the user
-        # 2. Compute CTL/ATL/TSB
-        # 3. Write back to a daily snapshot table
-        print(f"Recalculating metrics for user {user_id}, activity {strava_activity_id}")
+        daily_tss = load_daily_tss(db, user_id)
+        if daily_tss.empty:
+            return
+        pmc = calc_pmc(daily_tss)
+        upsert_pmc_daily(db, user_id, daily_tss, pmc)
+        db.commit()
+        logger.info(f"Recalculated metrics for user {user_id}: "
+                    f"{len(pmc)} days, latest CTL {pmc['ctl'].iloc[-1]:.1f}")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@celery.task
+def recalc_metrics_for_activity(user_id:str, strava_activity_id:int):
+    """
+    Rebuild CTL/ATL/TSB for the user of this activity.
+    Called after new ride ingested.
+    """
+    logger.info(f"Recalculating metrics for user {user_id} after activity {strava_activity_id}")
+    recalc_metrics_for_user(user_id)
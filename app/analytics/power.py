@@ -0,0 +1,56 @@
+"""
+power.py
+--------
+Power metrics for the AI-Bike-Coach platform.
+
+Responsibilities:
+- Calculate Normalized Power (NP) from a ride's 1 Hz power stream.
+- Called from the Strava ingest path so Activity.np is stored alongside the ride.
+
+TODO:
+- Add Intensity Factor and TSS once FTP is stored per user.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; fall back to a NumPy prefix-sum version
+    njit = None
+
+NP_WINDOW = 30  # seconds of rolling average used by the NP definition
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _np_power(watts):
+        # Running 30-sample sum in a ring buffer; accumulate the 4th power of each window mean
+        buf = np.zeros(NP_WINDOW)
+        s = 0.0
+        acc = 0.0
+        for i in range(watts.size):
+            j = i % NP_WINDOW
+            s += watts[i] - buf[j]
+            buf[j] = watts[i]
+            if i >= NP_WINDOW - 1:
+                m = s / NP_WINDOW
+                acc += m * m * m * m
+        return (acc / (watts.size - NP_WINDOW + 1)) ** 0.25
+
+    _np_power(np.zeros(NP_WINDOW))  # compile at import rather than on the first ride
+else:
+    def _np_power(watts):
+        c = np.concatenate(([0.0], np.cumsum(watts)))
+        means = (c[NP_WINDOW:] - c[:-NP_WINDOW]) / NP_WINDOW
+        return float(np.mean(means ** 4) ** 0.25)
+
+
+def normalized_power(watts):
+    """
+    Normalized Power: fourth root of the mean of the 30 s rolling average power raised to the 4th.
+    Missing samples count as zero watts. Returns None when the stream is shorter than 30 samples.
+    """
+    x = np.nan_to_num(np.asarray(watts, dtype=np.float64))
+    if x.size < NP_WINDOW:
+        return None
+    return float(_np_power(x))
@@ -0,0 +1,47 @@
+"""
+pr.py
+-----
+Personal record (PR) detection for the AI-Bike-Coach platform.
+
+Responsibilities:
+- Find the best N-second average power in a ride's power stream.
+- Provide best-effort results for the standard PR durations stored in PRRecord.
+- Used by analytics tasks after a new ride is ingested.
+
+TODO:
+- Add distance-based PRs (fastest 5 km, 20 km, etc.).
+- Compare best efforts against existing PRRecord rows and persist new PRs.
+"""
+
+import numpy as np
+
+# Standard PR durations in seconds (5 s sprint, 1 min, 5 min, 20 min)
+PR_WINDOWS = (5, 60, 300, 1200)
+
+def best_average(watts, window:int):
+    """
+    Best mean power over any `window` consecutive samples.
+    Returns (start_index, average_watts), or None if the ride is shorter than the window.
+    Missing samples count as zero watts.
+    """
+    x = np.nan_to_num(np.asarray(watts, dtype=np.float64))
+    if window <= 0 or x.size < window:
+        return None
+    # Every window sum from one prefix sum: sum(x[i:i+w]) == c[i+w] - c[i]
+    c = np.concatenate(([0.0], np.cumsum(x)))
+    means = (c[window:] - c[:-window]) / window
+    best_idx = int(np.argmax(means))
+    return best_idx, float(means[best_idx])
+
+def best_efforts(watts, windows=PR_WINDOWS):
+    """
+    Best average power for each window, as {window_seconds: (start_index, average_watts)}.
+    Windows longer than the ride are omitted.
+    """
+    x = np.nan_to_num(np.asarray(watts, dtype=np.float64))
+    efforts = {}
+    for window in windows:
+        best = best_average(x, window)
+        if best is not None:
+            efforts[window] = best
+    return efforts
@@ -0,0 +1,45 @@
+"""
+test_geo.py
+-----------
+Checks for the haversine distance helpers in app.analytics.geo.
+
+Run with: python -m pytest app/analytics/test_geo.py
+"""
+
+import numpy as np
+from app.analytics.geo import EARTH_RADIUS_M, NUMBA_MIN_POINTS, cumulative_distance, segment_distances
+
+# 0.001 degrees of latitude along a meridian
+STEP_M = EARTH_RADIUS_M * np.radians(0.001)
+
+
+def test_straight_track():
+    lat = np.arange(5) * 0.001
+    lon = np.zeros(5)
+    np.testing.assert_allclose(cumulative_distance(lat, lon), np.arange(5) * STEP_M)
+
+
+def test_gap_is_bridged():
+    lat = np.array([0.0, 0.001, np.nan, np.nan, 0.004, 0.005])
+    lon = np.array([0.0, 0.0, np.nan, np.nan, 0.0, 0.0])
+
+    seg = segment_distances(lat, lon)
+    assert np.isnan(seg[2]) and np.isnan(seg[3])
+    np.testing.assert_allclose(seg[4], 3 * STEP_M)
+
+    # Samples in the gap hold the last fix's distance; the total matches an unbroken track
+    np.testing.assert_allclose(
+        cumulative_distance(lat, lon), np.array([0, 1, 1, 1, 4, 5]) * STEP_M
+    )
+
+
+def test_leading_gap_and_numba_path():
+    n = NUMBA_MIN_POINTS + 10
+    lat = np.arange(n) * 0.001
+    lon = np.zeros(n)
+    lat[:3] = np.nan
+    lat[100:200] = np.nan
+
+    distance = cumulative_distance(lat, lon)
+    assert (distance[:4] == 0).all()
+    np.testing.assert_allclose(distance[-1], (n - 1 - 3) * STEP_M)
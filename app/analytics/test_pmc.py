@@ -0,0 +1,49 @@
+"""
+test_pmc.py
+-----------
+Checks for the CTL/ATL/TSB kernels in app.analytics.pmc.
+
+The Numba kernels and the SciPy lfilter fallback run depending on whether Numba is
+installed, so both are pinned against each other and against pandas.
+"""
+
+import numpy as np
+import pandas as pd
+from app.analytics.pmc import _ewma, _ewma_lfilter, _pmc, _pmc_lfilter, calc_ctl_atl, calc_pmc
+
+rng = np.random.default_rng(0)
+TSS = rng.uniform(0, 200, 400)
+
+
+def test_ewma_matches_pandas_when_seeded_with_first_value():
+    expected = pd.Series(TSS).ewm(alpha=1 / 42, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(_ewma(TSS, 1 / 42, TSS[0]), expected)
+    np.testing.assert_allclose(_ewma_lfilter(TSS, 1 / 42, TSS[0]), expected)
+
+
+def test_ewma_zero_seed_matches_pandas_with_a_rest_day_prepended():
+    expected = pd.Series(np.r_[0.0, TSS]).ewm(alpha=1 / 7, adjust=False).mean().to_numpy()[1:]
+    np.testing.assert_allclose(_ewma(TSS, 1 / 7, 0.0), expected)
+    np.testing.assert_allclose(_ewma_lfilter(TSS, 1 / 7, 0.0), expected)
+
+
+def test_pmc_kernel_matches_lfilter_fallback():
+    for ctl0, atl0 in ((0.0, 0.0), (60.0, 80.0)):
+        for fast, fallback in zip(_pmc(TSS, 1 / 42, 1 / 7, ctl0, atl0),
+                                  _pmc_lfilter(TSS, 1 / 42, 1 / 7, ctl0, atl0)):
+            np.testing.assert_allclose(fast, fallback)
+
+
+def test_pmc_starts_from_zero():
+    daily = pd.Series([150.0] + [0.0] * 9, index=pd.date_range("2025-01-01", periods=10))
+    pmc = calc_pmc(daily)
+    np.testing.assert_allclose(pmc["ctl"].iloc[0], 150 / 42)
+    np.testing.assert_allclose(pmc["atl"].iloc[0], 150 / 7)
+    assert pmc["tsb"].iloc[0] == 0
+    np.testing.assert_allclose(pmc["tsb"].iloc[1], 150 / 42 - 150 / 7)
+    np.testing.assert_allclose(calc_ctl_atl(daily, 42).to_numpy(), pmc["ctl"].to_numpy())
+
+
+def test_empty_series():
+    pmc = calc_pmc(pd.Series(dtype=np.float64))
+    assert pmc.empty
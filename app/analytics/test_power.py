@@ -0,0 +1,40 @@
+"""
+test_power.py
+-------------
+Known-value checks for Normalized Power in app.analytics.power.
+"""
+
+import numpy as np
+from app.analytics.power import NP_WINDOW, normalized_power
+
+
+def _reference_np(watts):
+    # Straight from the definition: 30 s rolling mean, 4th power, mean, 4th root
+    means = np.convolve(watts, np.ones(NP_WINDOW) / NP_WINDOW, mode="valid")
+    return np.mean(means ** 4) ** 0.25
+
+
+def test_steady_power_is_its_own_np():
+    np.testing.assert_allclose(normalized_power(np.full(600, 200.0)), 200.0)
+
+
+def test_intervals_match_reference():
+    watts = np.tile(np.r_[np.full(60, 350.0), np.full(60, 100.0)], 20)
+    np.testing.assert_allclose(normalized_power(watts), _reference_np(watts))
+    assert normalized_power(watts) > watts.mean()
+
+
+def test_random_ride_matches_reference():
+    watts = np.random.default_rng(0).uniform(0, 400, 3600)
+    np.testing.assert_allclose(normalized_power(watts), _reference_np(watts))
+
+
+def test_missing_samples_count_as_zero():
+    watts = np.full(120, 250.0)
+    watts[40:50] = np.nan
+    np.testing.assert_allclose(normalized_power(watts), _reference_np(np.nan_to_num(watts)))
+
+
+def test_short_stream_has_no_np():
+    assert normalized_power(np.full(NP_WINDOW - 1, 300.0)) is None
+    assert normalized_power(np.full(NP_WINDOW, 300.0)) is not None
@@ -0,0 +1,64 @@
+"""
+celery_app.py
+-------------
+Celery application for the AI-Bike-Coach background workers.
+
+Responsibilities:
+- Define the single Celery app shared by Strava sync and analytics tasks.
+- Route network-bound Strava tasks to the "fast" queue (eventlet pool) and
+  CPU/DB-bound analytics tasks, plus the asyncio-based initial sync listing,
+  to the "slow" queue (prefork pool).
+- Green psycopg2 when running under eventlet so DB calls don't block the hub.
+- Give each forked worker process its own warm connection pool.
+- Bound the broker's Redis connection pool so bursts of publishes don't exhaust Redis.
+
+Workers:
+    celery -A app.celery_app worker -Q fast -P eventlet -c 32 --prefetch-multiplier=0
+    celery -A app.celery_app worker -Q slow -P prefork -c 4
+"""
+
+from celery import Celery
+from celery.signals import eventlet_pool_started, worker_process_init
+from app.config import settings
+
+celery = Celery(
+    "app",
+    broker=settings.REDIS_URL,
+    backend=settings.REDIS_URL,  # needed for chords (initial sync -> one analytics run)
+    include=["app.strava.sync", "app.analytics.pmc"],
+)
+# Shared by the broker and (when configured) the Redis result backend
+REDIS_TRANSPORT_OPTIONS = {
+    "max_connections": 50,
+    "socket_keepalive": True,
+    "health_check_interval": 60,
+}
+
+celery.conf.update(
+    broker_pool_limit=10,
+    broker_transport_options=REDIS_TRANSPORT_OPTIONS,
+    result_backend_transport_options=REDIS_TRANSPORT_OPTIONS,
+    redis_max_connections=50,
+    result_expires=3600,
+    task_routes={
+        # Exact names win over the patterns below; this one runs an asyncio loop
+        "app.strava.sync.sync_initial_activities": {"queue": "slow"},
+        "app.strava.*": {"queue": "fast"},
+        "app.analytics.*": {"queue": "slow"},
+    },
+)
+
+@eventlet_pool_started.connect
+def _green_psycopg(**kwargs):
+    # psycopg2 is a C extension, so eventlet's monkey patching doesn't reach it
+    from psycogreen.eventlet import patch_psycopg
+    patch_psycopg()
+
+@worker_process_init.connect
+def _init_worker_db(**kwargs):
+    # Drop pool connections inherited from the parent without closing them (the parent
+    # still owns those sockets), then open one so the first task starts with a warm pool.
+    # SessionLocal stays bound to this same engine object.
+    from app.db.session import engine
+    engine.dispose(close=False)
+    engine.connect().close()
@@ -6,7 +6,7 @@ Configuration module for the AI-Bike-Coach backend.
 Responsibilities:
 - Define the Settings class using Pydantic BaseSettings for environment-based configuration.
 - Load sensitive credentials and connection strings (database, Redis, Strava, OpenAI, etc.) from environment variables or .env file.
-- Provide a singleton instance (settings) for use throughout the app.
+- Provide a cached, immutable singleton (get_settings / settings) for use throughout the app.
 
 TODO:
 - Add validation for required fields and custom error messages.
@@ -14,7 +14,8 @@ TODO:
 - Consider splitting secrets and non-secrets if security requirements increase.
 """
 
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str
@@ -24,8 +25,19 @@ class Settings(BaseSettings):
     STRAVA_CLIENT_SECRET: str
     OPENAI_API_KEY: str
     REDIS_URL: str = "redis://redis:6379/0"
-    
-    class Config:
-        env_file = ".env"
+    # Database connection pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 5
+    # Set when DATABASE_URL points at PgBouncer in transaction mode
+    PGBOUNCER: bool = False
 
-settings = Settings()
+    model_config = SettingsConfigDict(env_file=".env", frozen=True)
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Build Settings once per process; .env is parsed and validated only on the first call
+    """
+    return Settings()
+
+settings = get_settings()
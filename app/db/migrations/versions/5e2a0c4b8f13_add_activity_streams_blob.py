@@ -0,0 +1,40 @@
+"""Add columnar stream blob table and enable streams compression
+
+Revision ID: 5e2a0c4b8f13
+Revises: d19f6a8e3c72
+Create Date: 2025-05-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5e2a0c4b8f13'
+down_revision = 'd19f6a8e3c72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # One Arrow IPC buffer per activity holding all of its stream columns
+    op.create_table('activity_streams_blob',
+        sa.Column('activity_id', postgresql.UUID(), nullable=False),
+        sa.Column('arrow_ipc', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+        sa.PrimaryKeyConstraint('activity_id')
+    )
+
+    # Columnar compression for the row-per-sample hypertable, segmented per activity.
+    # Every primary-key column must be in segmentby or orderby, hence id after timestamp.
+    op.execute(
+        "ALTER TABLE streams SET ("
+        "timescaledb.compress, "
+        "timescaledb.compress_segmentby = 'activity_id', "
+        "timescaledb.compress_orderby = 'timestamp, id')"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE streams SET (timescaledb.compress = false)")
+    op.drop_table('activity_streams_blob')
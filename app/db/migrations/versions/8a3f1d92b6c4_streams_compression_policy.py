@@ -0,0 +1,28 @@
+"""Compress old streams chunks automatically
+
+Revision ID: 8a3f1d92b6c4
+Revises: 5e2a0c4b8f13
+Create Date: 2025-05-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8a3f1d92b6c4'
+down_revision = '5e2a0c4b8f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Background job that compresses chunks once they're older than the default
+    # 30-day initial sync window, so backfills COPY into uncompressed chunks
+    op.execute(
+        "SELECT add_compression_policy('streams', compress_after => INTERVAL '35 days', "
+        "if_not_exists => true)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("SELECT remove_compression_policy('streams', if_exists => true)")
@@ -0,0 +1,34 @@
+"""Add daily PMC snapshot table
+
+Revision ID: b7d41e2c9a05
+Revises: 42be22a75f1c
+Create Date: 2025-05-03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41e2c9a05'
+down_revision = '42be22a75f1c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create daily CTL/ATL/TSB snapshot table, one row per user per day
+    op.create_table('pmc_daily',
+        sa.Column('user_id', postgresql.UUID(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('tss', sa.Float(), nullable=True),
+        sa.Column('ctl', sa.Float(), nullable=True),
+        sa.Column('atl', sa.Float(), nullable=True),
+        sa.Column('tsb', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('pmc_daily')
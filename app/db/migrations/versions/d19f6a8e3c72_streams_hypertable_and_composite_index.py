@@ -0,0 +1,44 @@
+"""Index streams by (activity_id, timestamp) and convert to a hypertable
+
+Revision ID: d19f6a8e3c72
+Revises: b7d41e2c9a05
+Create Date: 2025-05-10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd19f6a8e3c72'
+down_revision = 'b7d41e2c9a05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+
+    # Per-activity reads filter on activity_id and order by timestamp; the composite
+    # index serves both, which makes the standalone timestamp index redundant
+    op.create_index('ix_streams_activity_time', 'streams', ['activity_id', 'timestamp'], unique=False)
+    op.drop_index(op.f('ix_streams_timestamp'), table_name='streams')
+
+    # Hypertable unique constraints must include the partitioning column
+    op.alter_column('streams', 'timestamp', existing_type=sa.DateTime(), nullable=False)
+    op.drop_constraint('streams_pkey', 'streams', type_='primary')
+    op.create_primary_key('streams_pkey', 'streams', ['id', 'timestamp'])
+
+    op.execute(
+        "SELECT create_hypertable('streams', 'timestamp', "
+        "chunk_time_interval => INTERVAL '7 days', "
+        "create_default_indexes => false, migrate_data => true)"
+    )
+
+
+def downgrade() -> None:
+    # TimescaleDB cannot turn a hypertable back into a plain table, and a hypertable rejects
+    # a primary key without its partitioning column, so PRIMARY KEY (id) can't be restored here
+    raise NotImplementedError(
+        "streams is a TimescaleDB hypertable and cannot be converted back in place; "
+        "copy its rows into a plain streams table and stamp the database at b7d41e2c9a05 instead"
+    )
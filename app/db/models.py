@@ -15,8 +15,8 @@ TODO:
 - Document each model class and its fields.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, \
-    ForeignKey, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Date, Float, \
+    ForeignKey, BigInteger, Index, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base, relationship
 import uuid, datetime as dt
@@ -32,7 +32,7 @@ class User(Base):
     token_expires_at = Column(DateTime)
     
     # Relationships
-    activities = relationship("Activity", back_populates="user")
+    activities = relationship("Activity", back_populates="user", lazy="raise")
 
 class Activity(Base):
     __tablename__ = "activities"
@@ -50,14 +50,21 @@ class Activity(Base):
     np = Column(Float)
     
     # Relationships
-    user = relationship("User", back_populates="activities")
-    streams = relationship("Stream", back_populates="activity")
+    # Implicit loads are refused: queries that need the owner ask for it with
+    # options(selectinload(Activity.user)); read streams through the projected query
+    # in app.strava.activities instead
+    user = relationship("User", back_populates="activities", lazy="raise")
+    streams = relationship("Stream", back_populates="activity", lazy="raise")
 
 class Stream(Base):
     __tablename__ = "streams"
+    # TimescaleDB hypertable partitioned on timestamp, so the primary key must include it
+    __table_args__ = (
+        Index("ix_streams_activity_time", "activity_id", "timestamp"),
+    )
     id = Column(UUID, primary_key=True, default=uuid.uuid4)
     activity_id = Column(UUID, ForeignKey("activities.id"))
-    timestamp = Column(DateTime, index=True)
+    timestamp = Column(DateTime, primary_key=True)
     lat = Column(Float)
     lon = Column(Float)
     altitude = Column(Float)
@@ -73,6 +80,14 @@ class Stream(Base):
     # Relationships
     activity = relationship("Activity", back_populates="streams")
 
+class ActivityStreamBlob(Base):
+    __tablename__ = "activity_streams_blob"
+    activity_id = Column(UUID, ForeignKey("activities.id"), primary_key=True)
+    arrow_ipc = Column(LargeBinary, nullable=False)  # see app.db.stream_blob
+    
+    # Relationships
+    activity = relationship("Activity")
+
 class PRRecord(Base):
     __tablename__ = "pr_records"
     id = Column(UUID, primary_key=True, default=uuid.uuid4)
@@ -87,4 +102,16 @@ class PRRecord(Base):
     
     # Relationships
     user = relationship("User")
-    activity = relationship("Activity")
\ No newline at end of file
+    activity = relationship("Activity")
+
+class PMCDaily(Base):
+    __tablename__ = "pmc_daily"
+    user_id = Column(UUID, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    tss = Column(Float)
+    ctl = Column(Float)  # Chronic Training Load (fitness)
+    atl = Column(Float)  # Acute Training Load (fatigue)
+    tsb = Column(Float)  # Training Stress Balance (form)
+    
+    # Relationships
+    user = relationship("User")
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""
+redis_client.py
+---------------
+Shared Redis client for the AI-Bike-Coach backend.
+
+Responsibilities:
+- Create a single Redis connection pool from app settings (REDIS_URL).
+- Used by caches and coordination helpers that live outside Celery's broker connection.
+"""
+
+import redis
+from app.config import settings
+
+# Capped pool; health checks drop connections Redis closed while idle
+redis_client = redis.Redis.from_url(
+    settings.REDIS_URL,
+    max_connections=50,
+    socket_keepalive=True,
+    health_check_interval=60,
+)
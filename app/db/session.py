@@ -6,16 +6,55 @@ SQLAlchemy session and engine setup for the AI-Bike-Coach backend.
 Responsibilities:
 - Create SQLAlchemy engine using app settings (DATABASE_URL).
 - Provide SessionLocal factory for DB sessions throughout the app.
+- Provide the get_db request-scoped session dependency for sync FastAPI routes.
+- Provide an asyncpg-backed AsyncSessionLocal factory for async FastAPI routes.
 - Used by all modules requiring DB access (analytics, Strava sync, agent, etc.).
-
-TODO:
-- Add connection pool tuning as needed for production.
-- Add support for async sessions if required.
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
\ No newline at end of file
+# query_cache_size raises SQLAlchemy's compiled-statement cache above its default of 500 entries.
+# values_plus_batch lets psycopg2 batch executemany() calls (e.g. bulk upserts) into few round-trips.
+# LIFO checkout keeps a small set of warm connections busy; behind PgBouncer the pre-ping
+# SELECT 1 is skipped since it can leave server connections idle in transaction.
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=30,
+    pool_recycle=60,
+    pool_use_lifo=True,
+    pool_pre_ping=not settings.PGBOUNCER,
+    executemany_mode="values_plus_batch",
+    query_cache_size=1200,
+)
+# Objects stay usable after commit without a reload SELECT (matches AsyncSessionLocal)
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+
+def get_db():
+    """
+    FastAPI dependency yielding a pooled session that is closed (and its connection
+    returned to the pool) when the request finishes
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Async engine for FastAPI routes, so DB I/O doesn't block the event loop.
+# asyncpg's prepared statement cache must be disabled behind PgBouncer transaction pooling.
+async_engine = create_async_engine(
+    make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg"),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=60,
+    pool_use_lifo=True,
+    pool_pre_ping=not settings.PGBOUNCER,
+    connect_args={"statement_cache_size": 0} if settings.PGBOUNCER else {},
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
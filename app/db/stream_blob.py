@@ -0,0 +1,60 @@
+"""
+stream_blob.py
+--------------
+Columnar (Arrow IPC) encoding of activity streams for the AI-Bike-Coach backend.
+
+Responsibilities:
+- Pack a ride's stream samples into one Arrow IPC buffer with narrow dtypes.
+- Unpack stored buffers back into a pandas DataFrame for analytics.
+- Downsample stored buffers to every Nth sample for the API's Arrow stream endpoint.
+- Used by the Strava ingest path and readers of the activity_streams_blob table.
+"""
+
+import io
+import pandas as pd
+import pyarrow as pa
+
+# Narrowest dtypes that hold Strava's stream values; nullable ints keep missing samples
+STREAM_DTYPES = {
+    "lat": "float64",
+    "lon": "float64",
+    "altitude": "float32",
+    "distance": "float32",
+    "velocity_smooth": "float32",
+    "heartrate": "Int16",
+    "cadence": "Int16",
+    "watts": "Int16",
+    "temp": "float32",
+    "moving": "boolean",
+    "grade_smooth": "float32",
+}
+
+def encode_streams(frame: pd.DataFrame) -> bytes:
+    """
+    Serialize a stream DataFrame (timestamp plus STREAM_DTYPES columns) to Arrow IPC bytes.
+    """
+    frame = frame.astype({col: dtype for col, dtype in STREAM_DTYPES.items() if col in frame.columns})
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def sample_streams(buf: bytes, every: int) -> bytes:
+    """
+    Re-encode an Arrow IPC buffer keeping only every Nth row; the buffer is returned as-is when every is 1.
+    """
+    if every <= 1:
+        return buf
+    table = pa.ipc.open_stream(buf).read_all()
+    table = table.take(pa.array(range(0, table.num_rows, every)))
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def decode_streams(buf: bytes) -> pd.DataFrame:
+    """
+    Read an Arrow IPC buffer written by encode_streams back into a DataFrame.
+    """
+    return pa.ipc.open_stream(buf).read_pandas()
@@ -0,0 +1,46 @@
+"""
+test_stream_blob.py
+-------------------
+Round-trip checks for the Arrow IPC stream codec in app.db.stream_blob.
+"""
+
+import numpy as np
+import pandas as pd
+from app.db.stream_blob import STREAM_DTYPES, decode_streams, encode_streams, sample_streams
+
+N = 10
+
+
+def _frame() -> pd.DataFrame:
+    frame = pd.DataFrame({
+        "timestamp": pd.date_range("2025-05-01 08:00", periods=N, freq="s", tz="UTC"),
+        **{col: np.arange(N, dtype=np.float64) for col in STREAM_DTYPES},
+    })
+    frame["moving"] = np.arange(N) % 2 == 0
+    frame.loc[3, ["heartrate", "watts", "lat"]] = np.nan  # dropouts stay missing
+    return frame.astype(STREAM_DTYPES)
+
+
+def test_round_trip_keeps_values_and_dtypes():
+    frame = _frame()
+    decoded = decode_streams(encode_streams(frame))
+    pd.testing.assert_frame_equal(decoded, frame, check_dtype=False)
+    for col, dtype in STREAM_DTYPES.items():
+        assert decoded[col].dtype == pd.api.types.pandas_dtype(dtype), col
+    assert decoded["watts"].isna().tolist() == [i == 3 for i in range(N)]
+
+
+def test_encode_narrows_wide_input():
+    frame = _frame().astype({"watts": "float64", "altitude": "float64"})
+    decoded = decode_streams(encode_streams(frame))
+    assert decoded["watts"].dtype == pd.Int16Dtype()
+    assert decoded["altitude"].dtype == np.float32
+
+
+def test_sample_streams_keeps_every_nth_row():
+    frame = _frame()
+    buf = encode_streams(frame)
+    assert sample_streams(buf, 1) is buf
+    sampled = decode_streams(sample_streams(buf, 3))
+    pd.testing.assert_frame_equal(sampled, frame.iloc[::3].reset_index(drop=True), check_dtype=False)
+    assert sampled["heartrate"].dtype == pd.Int16Dtype()
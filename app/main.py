@@ -4,7 +4,7 @@ main.py
 Entrypoint for the AI-Bike-Coach FastAPI backend application.
 
 Responsibilities:
-- Initialize the FastAPI app instance.
+- Initialize the FastAPI app instance and its shared outbound HTTP client.
 - Register API routers (e.g., Strava webhook, authentication, analytics, agent, etc.).
 - Provide a root endpoint for health/status checks.
 
@@ -16,16 +16,29 @@ TODO:
 """
 
 # AI-Bike-Coach FastAPI backend entrypoint
+from contextlib import asynccontextmanager
+import httpx
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from .config import settings
 from .strava.webhook import router as strava_webhook_router
 from .strava.routes import router as strava_auth_router
 from .strava.sync_routes import router as strava_sync_router
 from .strava.activities import router as activities_router
-from .db.session import engine
-from .db import models
+from .agent.routes import router as agent_router
 
-app = FastAPI(title="AI-Bike-Coach API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP/2 client for outbound Strava calls made while serving requests
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30),
+    )
+    yield
+    await app.state.http.aclose()
+
+app = FastAPI(title="AI-Bike-Coach API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Register Strava webhook endpoints
 app.include_router(strava_webhook_router, prefix="/strava")
@@ -39,6 +52,9 @@ app.include_router(strava_sync_router, prefix="/sync")
 # Register activities endpoints
 app.include_router(activities_router)
 
+# Register chat agent endpoints
+app.include_router(agent_router, prefix="/agent")
+
 @app.get("/")
 def root():
     return {"message": "AI-Bike-Coach API running"}
@@ -47,7 +63,4 @@ def root():
 def health():
     return {"status": "ok"}
 
-# Create DB tables on startup if they don't exist
-models.Base.metadata.create_all(bind=engine)
-
-# TODO: Add more routers (analytics, agent, etc.)
+# TODO: Add more routers (analytics, etc.)
@@ -5,116 +5,179 @@ API routes for activities and streams in the AI-Bike-Coach backend.
 
 Responsibilities:
 - Provide FastAPI routes for listing activities and detailed activity data
-- Fetch activity streams for the ride explorer
+- Fetch activity streams for the ride explorer, as NDJSON rows or as the stored Arrow IPC blob
 - Serve as the data layer between the UI and the database
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
-from app.db.session import SessionLocal
-from app.db.models import Activity, Stream, User
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import datetime as dt
+import orjson
+import uuid
+from app.db.session import AsyncSessionLocal
+from app.db.models import Activity, ActivityStreamBlob, Stream, User
+from app.db.stream_blob import sample_streams
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Helper function to get a database session
-def get_db():
-    db = SessionLocal()
-    try:
+class ActivityOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: uuid.UUID
+    strava_id: Optional[int] = None
+    user_id: Optional[uuid.UUID] = None
+    name: Optional[str] = None
+    start_time: Optional[dt.datetime] = None
+    distance_m: Optional[float] = None
+    moving_time_s: Optional[int] = None
+    elev_gain_m: Optional[float] = None
+    avg_power: Optional[float] = None
+    avg_hr: Optional[float] = None
+
+# Columns selected for ActivityOut
+ACTIVITY_COLUMNS = (
+    Activity.id,
+    Activity.strava_id,
+    Activity.user_id,
+    Activity.name,
+    Activity.start_time,
+    Activity.distance_m,
+    Activity.moving_time_s,
+    Activity.elev_gain_m,
+    Activity.avg_power,
+    Activity.avg_hr,
+)
+
+# Columns returned by the streams endpoint
+STREAM_COLUMNS = (
+    Stream.timestamp,
+    Stream.lat,
+    Stream.lon,
+    Stream.altitude,
+    Stream.distance,
+    Stream.velocity_smooth,
+    Stream.heartrate,
+    Stream.cadence,
+    Stream.watts,
+    Stream.temp,
+    Stream.moving,
+    Stream.grade_smooth,
+)
+
+# Rows fetched per server-side cursor round-trip when streaming
+STREAM_BATCH_SIZE = 2000
+
+# Helper function to get an async database session
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-@router.get("/activities", response_model=List[Dict[str, Any]])
-async def get_activities(db: Session = Depends(get_db)):
+@router.get("/activities", response_model=List[ActivityOut])
+async def get_activities(db: AsyncSession = Depends(get_db)):
     """
     Get all activities.
     In a production app, this would filter by authenticated user.
     """
     try:
-        activities = db.query(Activity).order_by(Activity.start_time.desc()).all()
-        # Convert to dictionaries for JSON serialization
-        return [
-            {
-                "id": str(activity.id),
-                "strava_id": activity.strava_id,
-                "user_id": str(activity.user_id),
-                "name": activity.name,
-                "start_time": activity.start_time.isoformat(),
-                "distance_m": activity.distance_m,
-                "moving_time_s": activity.moving_time_s,
-                "elev_gain_m": activity.elev_gain_m,
-                "avg_power": activity.avg_power,
-                "avg_hr": activity.avg_hr
-            }
-            for activity in activities
-        ]
+        # Project only the columns we return; rows come back as mappings, not ORM instances
+        result = await db.execute(select(*ACTIVITY_COLUMNS).order_by(Activity.start_time.desc()))
+        return result.mappings().all()
     except Exception as e:
         logger.error(f"Error fetching activities: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching activities: {str(e)}")
 
-@router.get("/activities/{activity_id}", response_model=Dict[str, Any])
-async def get_activity(activity_id: str, db: Session = Depends(get_db)):
+@router.get("/activities/{activity_id}", response_model=ActivityOut)
+async def get_activity(activity_id: str, db: AsyncSession = Depends(get_db)):
     """
     Get details for a specific activity by ID
     """
     try:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
+        result = await db.execute(select(*ACTIVITY_COLUMNS).where(Activity.id == activity_id))
+        activity = result.mappings().first()
         if not activity:
             raise HTTPException(status_code=404, detail=f"Activity {activity_id} not found")
         
-        return {
-            "id": str(activity.id),
-            "strava_id": activity.strava_id,
-            "user_id": str(activity.user_id),
-            "name": activity.name,
-            "start_time": activity.start_time.isoformat(),
-            "distance_m": activity.distance_m,
-            "moving_time_s": activity.moving_time_s,
-            "elev_gain_m": activity.elev_gain_m,
-            "avg_power": activity.avg_power,
-            "avg_hr": activity.avg_hr
-        }
+        return activity
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching activity {activity_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching activity: {str(e)}")
 
-@router.get("/activities/{activity_id}/streams", response_model=List[Dict[str, Any]])
-async def get_activity_streams(activity_id: str, db: Session = Depends(get_db)):
+async def _iter_stream_ndjson(activity_id: str, every: int = 1):
     """
-    Get all stream data points for a specific activity
+    Yield stream rows for an activity as NDJSON, one chunk per server-side cursor batch.
+    Only every Nth sample is emitted when every > 1.
+    Uses its own session since the response body is produced after the route returns.
     """
+    stmt = (
+        select(*STREAM_COLUMNS)
+        .where(Stream.activity_id == activity_id)
+        .order_by(Stream.timestamp)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
     try:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(stmt)
+            offset = 0
+            async for batch in result.mappings().partitions():
+                # Keep the sampling phase continuous across batch boundaries
+                rows = batch[(-offset) % every::every]
+                offset += len(batch)
+                if rows:
+                    yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+    except Exception as e:
+        logger.error(f"Error streaming rows for activity {activity_id}: {e}")
+        raise
+
+@router.get("/activities/{activity_id}/streams")
+async def get_activity_streams(
+    activity_id: str,
+    every: int = Query(1, ge=1, le=100, description="Return every Nth sample"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get the stream data points for a specific activity as newline-delimited JSON,
+    optionally downsampled to every Nth sample
+    """
+    try:
+        result = await db.execute(select(Activity.id).where(Activity.id == activity_id))
+        if result.scalar() is None:
             raise HTTPException(status_code=404, detail=f"Activity {activity_id} not found")
-        
-        streams = db.query(Stream).filter(Stream.activity_id == activity_id).order_by(Stream.timestamp).all()
-        
-        return [
-            {
-                "id": str(stream.id),
-                "timestamp": stream.timestamp.isoformat(),
-                "lat": stream.lat,
-                "lon": stream.lon,
-                "altitude": stream.altitude,
-                "distance": stream.distance,
-                "velocity_smooth": stream.velocity_smooth,
-                "heartrate": stream.heartrate,
-                "cadence": stream.cadence,
-                "watts": stream.watts,
-                "temp": stream.temp,
-                "moving": stream.moving,
-                "grade_smooth": stream.grade_smooth
-            }
-            for stream in streams
-        ]
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching streams for activity {activity_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Error fetching streams: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching streams: {str(e)}")
+    
+    return StreamingResponse(_iter_stream_ndjson(activity_id, every), media_type="application/x-ndjson")
+
+@router.get("/activities/{activity_id}/streams.arrow")
+async def get_activity_streams_arrow(
+    activity_id: str,
+    every: int = Query(1, ge=1, le=100, description="Return every Nth sample"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get an activity's streams as an Arrow IPC stream, served from the columnar copy stored at
+    ingest. 404 when the activity has no stored copy; the NDJSON endpoint covers those.
+    """
+    try:
+        result = await db.execute(
+            select(ActivityStreamBlob.arrow_ipc).where(ActivityStreamBlob.activity_id == activity_id)
+        )
+        buf = result.scalar()
+    except Exception as e:
+        logger.error(f"Error fetching stream blob for activity {activity_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching streams: {str(e)}")
+    
+    if buf is None:
+        raise HTTPException(status_code=404, detail=f"No stored streams for activity {activity_id}")
+    
+    return Response(content=sample_streams(buf, every), media_type="application/vnd.apache.arrow.stream")
@@ -8,40 +8,76 @@ Responsibilities:
 - Handle access token assignment and client credentials.
 - Used by Strava sync tasks and webhook handlers.
 - Refresh tokens automatically when they expire.
+- Cache access tokens per process so repeated calls don't hit the database.
+- Provide a shared pooled HTTP session (SESSION) for direct Strava REST calls.
+- Provide cached bearer header dicts (bearer_headers) for those calls.
 """
 
 from stravalib import Client
+from cachetools import TTLCache
 from app.config import settings
 from app.db.session import SessionLocal
 from app.db.models import User
 import datetime as dt
+from functools import lru_cache
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_client(access_token:str|None=None, user_id:str|None=None):
+# One keep-alive pool for all direct Strava calls, so TLS handshakes happen once per connection.
+# Only idempotent requests are retried; 429s are left to app.strava.ratelimit rather than
+# retried here, since every retry would spend more of the same quota.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504]),
+))
+
+# user_id -> (access_token, expires_at epoch seconds); entries are served until they get close to expiry.
+# Bounded, and re-read from the database after 50 minutes in case another process rotated the token.
+# TTLCache reorders itself on reads, so every access goes through _CACHE_LOCK; _TOKEN_LOCK
+# serialises the slow database read / Strava refresh on a miss.
+_TOKEN_CACHE: TTLCache = TTLCache(maxsize=1000, ttl=3000)
+_CACHE_LOCK = threading.Lock()
+_TOKEN_LOCK = threading.Lock()
+TOKEN_REFRESH_MARGIN = dt.timedelta(minutes=5)
+_REFRESH_MARGIN_SECONDS = TOKEN_REFRESH_MARGIN.total_seconds()
+
+def _cached_token(user_id:str)->str|None:
+    with _CACHE_LOCK:
+        entry = _TOKEN_CACHE.get(user_id)
+    if entry and entry[1] - time.time() > _REFRESH_MARGIN_SECONDS:
+        return entry[0]
+    return None
+
+def get_access_token(user_id:str)->str:
     """
-    Returns a configured Strava client instance.
-    
-    If access_token is provided, uses it directly.
-    If user_id is provided, fetches (and refreshes if needed) the token for that user.
-    Otherwise, returns a client without an access token (can only be used for authorization).
+    Returns a valid access token for the user, refreshing it with Strava if it expires within 5 minutes.
+    Served from the in-process cache when possible; only misses touch the database.
     """
-    client = Client()
-    client.client_id = settings.STRAVA_CLIENT_ID
-    client.client_secret = settings.STRAVA_CLIENT_SECRET
-    
-    if access_token:
-        client.token = access_token
-        return client
+    user_id = str(user_id)
+    token = _cached_token(user_id)
+    if token:
+        return token
     
-    if user_id:
+    with _TOKEN_LOCK:
+        # Another thread may have refreshed while we waited for the lock
+        token = _cached_token(user_id)
+        if token:
+            return token
+        
         with SessionLocal() as db:
             user = db.query(User).filter(User.id == user_id).first()
             if not user:
                 raise ValueError(f"User with ID {user_id} not found")
             
             # Check if token needs to be refreshed
-            if user.token_expires_at and user.token_expires_at <= dt.datetime.now() + dt.timedelta(minutes=5):
+            if user.token_expires_at and user.token_expires_at.timestamp() - time.time() < _REFRESH_MARGIN_SECONDS:
                 # Token is expired or will expire soon, refresh it
-                refresh_response = client.refresh_access_token(
+                refresh_response = Client().refresh_access_token(
                     client_id=settings.STRAVA_CLIENT_ID,
                     client_secret=settings.STRAVA_CLIENT_SECRET,
                     refresh_token=user.refresh_token
@@ -53,7 +89,43 @@ def get_client(access_token:str|None=None, user_id:str|None=None):
                 user.token_expires_at = dt.datetime.fromtimestamp(refresh_response['expires_at'])
                 db.commit()
             
-            # Set the access token on the client
-            client.token = user.access_token
+            # Tokens without a recorded expiry are never refreshed, so cache them indefinitely
+            expires_at = user.token_expires_at.timestamp() if user.token_expires_at else float("inf")
+            with _CACHE_LOCK:
+                _TOKEN_CACHE[user_id] = (user.access_token, expires_at)
+            return user.access_token
+
+@lru_cache(maxsize=128)
+def bearer_headers(access_token:str)->dict[str, str]:
+    """
+    Authorization header dict for a token, shared between calls; callers must not mutate it.
+    """
+    return {"Authorization": f"Bearer {access_token}"}
+
+def invalidate_token(user_id:str)->None:
+    """
+    Drop the cached token for a user, e.g. after the OAuth callback rotates it.
+    """
+    with _CACHE_LOCK:
+        _TOKEN_CACHE.pop(str(user_id), None)
+
+def get_client(access_token:str|None=None, user_id:str|None=None):
+    """
+    Returns a configured Strava client instance.
+    
+    If access_token is provided, uses it directly.
+    If user_id is provided, fetches (and refreshes if needed) the token for that user.
+    Otherwise, returns a client without an access token (can only be used for authorization).
+    """
+    client = Client()
+    client.client_id = settings.STRAVA_CLIENT_ID
+    client.client_secret = settings.STRAVA_CLIENT_SECRET
+    
+    if access_token:
+        client.token = access_token
+        return client
+    
+    if user_id:
+        client.token = get_access_token(user_id)
     
     return client
@@ -0,0 +1,69 @@
+"""
+ratelimit.py
+------------
+Shared Strava API rate limiter for the AI-Bike-Coach sync workers.
+
+Responsibilities:
+- Count Strava requests per 15-minute window in Redis so every worker shares one budget.
+- Resync the counter from Strava's X-RateLimit-Usage / X-RateLimit-Limit response headers.
+- Tell callers how long to wait when the window is exhausted, so Celery tasks can retry later.
+
+TODO:
+- Track the daily limit as well as the 15-minute one.
+"""
+
+import time
+from app.db.redis_client import redis_client
+
+KEY_PREFIX = "strava:ratelimit:"
+WINDOW_SECONDS = 900  # Strava's short-term limit resets every quarter hour
+DEFAULT_LIMIT = 100  # requests per window, until Strava tells us otherwise
+HEADROOM = 5  # leave a few calls for webhooks and OAuth
+
+class StravaRateLimited(Exception):
+    """
+    Raised when the shared 15-minute budget is spent; retry_after is seconds until the next window.
+    """
+    def __init__(self, retry_after:int):
+        super().__init__(f"Strava rate limit reached, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+def _window(now:float)->tuple[str, int]:
+    # Windows are aligned to wall-clock quarter hours, like Strava's own
+    start = int(now) - int(now) % WINDOW_SECONDS
+    return f"{KEY_PREFIX}{start}", start + WINDOW_SECONDS - int(now)
+
+def retry_after()->int:
+    """
+    Seconds until the next window opens, e.g. for the Retry-After of a Strava 429.
+    """
+    return _window(time.time())[1] + 1
+
+def acquire()->None:
+    """
+    Reserve one request in the current window, or raise StravaRateLimited.
+    """
+    key, remaining = _window(time.time())
+    pipe = redis_client.pipeline()
+    pipe.incr(key)
+    pipe.expire(key, remaining + 1)
+    pipe.get(f"{KEY_PREFIX}limit")
+    used, _, limit = pipe.execute()
+    limit = int(limit) if limit else DEFAULT_LIMIT
+    if used > limit - HEADROOM:
+        raise StravaRateLimited(retry_after())
+
+def record_usage(headers)->None:
+    """
+    Overwrite the local counter with Strava's authoritative usage from a response's headers.
+    """
+    usage = headers.get("X-RateLimit-Usage")
+    if not usage:
+        return
+    key, remaining = _window(time.time())
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(key, int(usage.split(",")[0]), ex=remaining + 1)
+    limit = headers.get("X-RateLimit-Limit")
+    if limit:
+        pipe.set(f"{KEY_PREFIX}limit", int(limit.split(",")[0]))
+    pipe.execute()
@@ -13,44 +13,47 @@ from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 import datetime as dt
+from functools import lru_cache
+from urllib.parse import urlencode
 import uuid
-import requests
 import json
 
-from app.db.session import SessionLocal
+from app.db.session import get_db
 from app.db.models import User
 from app.config import settings
-from app.strava.client import get_client
+from app.strava.client import invalidate_token
 
 router = APIRouter()
 
-# Helper function to get a database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+STRAVA_AUTHORIZE_URL = "https://www.strava.com/oauth/authorize"
+STRAVA_SCOPES = ('read', 'activity:read_all', 'profile:read_all')
+
+@lru_cache(maxsize=8)
+def _authorize_url(redirect_uri: str, scope: tuple) -> str:
+    """
+    Strava authorization URL for a callback and scope set; only those inputs vary, so it's built once each.
+    """
+    return f"{STRAVA_AUTHORIZE_URL}?" + urlencode({
+        'client_id': settings.STRAVA_CLIENT_ID,
+        'redirect_uri': redirect_uri,
+        'response_type': 'code',
+        'approval_prompt': 'auto',
+        'scope': ",".join(scope),
+    })
 
 @router.get("/login")
 async def strava_login(request: Request):
     """
     Initiates the Strava OAuth flow by redirecting to Strava's authorization page.
     """
-    client = get_client()
     # Make sure to use the complete URL for the callback
     redirect_uri = f"{request.base_url.scheme}://{request.base_url.netloc}/auth/callback"
     
-    authorize_url = client.authorization_url(
-        client_id=settings.STRAVA_CLIENT_ID,
-        redirect_uri=redirect_uri,
-        scope=['read', 'activity:read_all', 'profile:read_all']
-    )
-    
-    return RedirectResponse(authorize_url)
+    return RedirectResponse(_authorize_url(redirect_uri, STRAVA_SCOPES))
 
 @router.get("/callback")
 async def strava_callback(
+    request: Request,
     code: str, 
     scope: str = None, 
     db: Session = Depends(get_db)
@@ -72,7 +75,8 @@ async def strava_callback(
             'grant_type': 'authorization_code'
         }
         
-        response = requests.post(token_url, data=payload)
+        # Shared async client from the app lifespan, so the event loop isn't blocked
+        response = await request.app.state.http.post(token_url, data=payload)
         if response.status_code != 200:
             raise HTTPException(
                 status_code=response.status_code, 
@@ -114,6 +118,9 @@ async def strava_callback(
         
         db.commit()
         
+        # Tokens just rotated; make the next sync read them from the database
+        invalidate_token(user.id)
+        
         # Redirect to a success page or the main app
         return RedirectResponse(url="/auth/success")
         
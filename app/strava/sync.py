@@ -9,83 +9,356 @@ Responsibilities:
 - Used by webhook and manual sync flows.
 """
 
-from celery import Celery
+import asyncio
 import datetime as dt
-from typing import List, Dict, Any, Optional
+import io
+import os
+from typing import List, Dict, Any, Optional, Tuple
+import time
 import uuid
-from sqlalchemy import desc
+import numpy as np
+import orjson
+import pandas as pd
+from celery import chord
+from celery.app.task import Context
+from celery_batches import Batches
+from sqlalchemy import desc, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from app.celery_app import celery
 from app.db.session import SessionLocal
-from app.db.models import User, Activity, Stream
-from app.strava.client import get_client
-from app.analytics.pmc import recalc_metrics_for_activity
+from app.db.redis_client import redis_client
+from app.db.models import User, Activity, ActivityStreamBlob
+from app.db.stream_blob import encode_streams, STREAM_DTYPES
+from app.strava.client import get_client, get_access_token, bearer_headers, SESSION
+from app.analytics.pmc import recalc_metrics_for_activity, recalc_metrics_for_user
+from app.analytics.power import normalized_power
+from app.analytics.geo import cumulative_distance
+from app.strava import ratelimit
+from app.strava.ratelimit import StravaRateLimited
 import logging
+import httpx
 import requests
-from app.config import settings
 
 logger = logging.getLogger(__name__)
-celery = Celery(__name__, broker="redis://redis:6379/0")
 
-@celery.task
-def enqueue_activity_fetch(user_id: str, strava_activity_id: int):
+def _strava_get(url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None) -> requests.Response:
     """
-    Fetch a single activity from Strava and store it in the database
+    GET against the Strava API within the shared rate limit budget
+    Raises StravaRateLimited when the budget is spent or Strava answers 429
     """
+    ratelimit.acquire()
+    response = SESSION.get(url, headers=headers, params=params)
+    ratelimit.record_usage(response.headers)
+    if response.status_code == 429:
+        raise StravaRateLimited(ratelimit.retry_after())
+    return response
+
+
+# Raw Strava responses per activity, so re-fired fetches don't spend API quota again
+RESPONSE_CACHE_TTL = 7 * 86400
+RESPONSE_CACHE_ENDPOINTS = ("activity", "streams")
+
+def _response_cache_key(strava_activity_id: int, endpoint: str) -> str:
+    return f"strava:response:{strava_activity_id}:{endpoint}"
+
+
+def _strava_get_cached(cache_key: str, url: str, headers: Dict[str, str],
+                       params: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+    """
+    _strava_get with successful response bodies cached in Redis for RESPONSE_CACHE_TTL
+    Returns (status_code, body); cache hits report 200. Redis errors fall through to Strava.
+    """
+    try:
+        cached = redis_client.get(cache_key)
+    except RedisError as e:
+        logger.warning(f"Strava response cache unavailable: {e}")
+        cached = None
+    if cached is not None:
+        return 200, cached
+    
+    response = _strava_get(url, headers, params)
+    if response.status_code == 200:
+        try:
+            redis_client.setex(cache_key, RESPONSE_CACHE_TTL, response.content)
+        except RedisError as e:
+            logger.warning(f"Could not cache Strava response {cache_key}: {e}")
+    return response.status_code, response.content
+
+
+def invalidate_cached_activity(strava_activity_id: int) -> None:
+    """
+    Drop cached Strava responses for an activity, e.g. when a webhook reports it changed
+    """
+    try:
+        redis_client.delete(*(_response_cache_key(strava_activity_id, endpoint) for endpoint in RESPONSE_CACHE_ENDPOINTS))
+    except RedisError as e:
+        logger.warning(f"Could not invalidate cached Strava responses for {strava_activity_id}: {e}")
+
+
+def _fetch_args(request) -> Dict[str, Any]:
+    # Batched requests keep whatever mix of positional/keyword arguments the caller used
+    args = dict(zip(("user_id", "strava_activity_id"), request.args))
+    args.update(request.kwargs or {})
+    return args
+
+
+def _request_context(request) -> Context:
+    # SimpleRequest doesn't carry chord/group membership itself; the original headers do
+    return Context(request.request_dict or {})
+
+
+def _mark_fetch_done(request, result=None) -> None:
+    # Batches doesn't record per-call results, so do it here; this is what lets a chord
+    # over these fetches (see sync_initial_activities) count them and run its body
+    enqueue_activity_fetch.backend.mark_as_done(request.id, result, request=_request_context(request))
+
+
+def _mark_fetch_failed(request, exc: Exception) -> None:
+    # Recorded as a failure so it shows up in the result backend; a chord over the fetches
+    # still gets this part's result and completes (with an error) rather than hanging
+    enqueue_activity_fetch.backend.mark_as_failure(request.id, exc, request=_request_context(request))
+
+
+def _requeue_fetch(request, countdown: int, kwargs: Optional[Dict[str, Any]] = None) -> None:
+    # Same task id and chord/group membership, so a pending chord still waits for this fetch
+    context = _request_context(request)
+    enqueue_activity_fetch.apply_async(
+        request.args, request.kwargs if kwargs is None else kwargs, countdown=countdown, task_id=request.id,
+        chord=context.chord, group_id=context.group, group_index=context.group_index,
+    )
+
+
+# Transient failures (network errors, Strava 5xx, DB deadlocks/disconnects) are retried with
+# exponential backoff; the attempt count travels in the call's kwargs
+FETCH_MAX_ATTEMPTS = 5
+FETCH_RETRY_BASE_SECONDS = 30
+TRANSIENT_FETCH_ERRORS = (requests.RequestException, OperationalError)
+
+
+@celery.task(base=Batches, flush_every=32, flush_interval=10)
+def enqueue_activity_fetch(batch):
+    """
+    Fetch activities from Strava and store them in the database
+    Calls are queued as enqueue_activity_fetch.delay(user_id, strava_activity_id[, summary=...])
+    and processed up to 32 at a time (or every 10 s) with one session and one HTTP pool
+    Fetches left when the rate limit budget runs out are re-queued for the next window
+    Transient failures are re-queued with backoff, up to FETCH_MAX_ATTEMPTS, then marked failed
+    Permanent failures (unknown user, activity not on Strava) are marked done with no result
+    Every call ends with a recorded result, so chords over fetches always complete
+    """
+    # Users stay loaded across the batch's commits, so each is read once per batch
+    db = SessionLocal()
+    users: Dict[str, Optional[User]] = {}
     try:
-        db = SessionLocal()
-        fetch_and_store_activity(db, user_id, strava_activity_id)
+        for i, request in enumerate(batch):
+            args = _fetch_args(request)
+            user_id, strava_activity_id = str(args["user_id"]), args["strava_activity_id"]
+            try:
+                if user_id not in users:
+                    users[user_id] = db.get(User, user_id)
+                if users[user_id] is None:
+                    raise ValueError(f"User with ID {user_id} not found")
+                activity_id = fetch_and_store_activity(
+                    db, users[user_id], strava_activity_id,
+                    trigger_recalc=args.get("trigger_recalc", True),
+                    summary=args.get("summary"),
+                )
+            except StravaRateLimited as e:
+                logger.info(f"Rate limited, re-queueing {len(batch) - i} activity fetches in {e.retry_after}s")
+                for pending in batch[i:]:
+                    _requeue_fetch(pending, e.retry_after)
+                break
+            except TRANSIENT_FETCH_ERRORS as e:
+                db.rollback()
+                attempt = int(args.get("attempt", 1))
+                if attempt >= FETCH_MAX_ATTEMPTS:
+                    logger.error(f"Giving up on activity {strava_activity_id} for user {user_id} "
+                                 f"after {attempt} attempts: {e}")
+                    _mark_fetch_failed(request, e)
+                else:
+                    countdown = FETCH_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+                    logger.warning(f"Transient error fetching activity {strava_activity_id} for user {user_id}, "
+                                   f"retry {attempt} in {countdown}s: {e}")
+                    _requeue_fetch(request, countdown, {**(request.kwargs or {}), "attempt": attempt + 1})
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error fetching activity {strava_activity_id} for user {user_id}: {e}")
+                _mark_fetch_done(request)
+            else:
+                _mark_fetch_done(request, str(activity_id) if activity_id else None)
+    finally:
         db.close()
-    except Exception as e:
-        logger.error(f"Error fetching activity {strava_activity_id} for user {user_id}: {e}")
-        raise
 
 
-def fetch_and_store_activity(db: Session, user_id: str, strava_activity_id: int) -> Optional[uuid.UUID]:
+def _stream_values(streams: Dict[str, Any], key: str, n: int) -> np.ndarray:
     """
-    Fetch a single activity from Strava and store in database
-    Returns the UUID of the created activity
+    One optional Strava stream as a float array of length n; missing or short streams pad with NaN
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise ValueError(f"User with ID {user_id} not found")
+    out = np.full(n, np.nan)
+    if key in streams:
+        data = streams[key]['data'][:n]
+        out[:len(data)] = pd.Series(data, dtype="float64").to_numpy()
+    return out
+
+
+def _build_stream_frame(streams: Dict[str, Any], start_epoch: int) -> pd.DataFrame:
+    """
+    Turn Strava's key_by_type streams into one DataFrame (timestamp plus STREAM_DTYPES columns)
+    """
+    t = np.asarray(streams['time']['data'], dtype=np.int64)
+    n = t.size
     
-    # Check if activity already exists
-    existing = db.query(Activity).filter(Activity.strava_id == strava_activity_id).first()
-    if existing:
-        logger.info(f"Activity {strava_activity_id} already exists, skipping")
-        return existing.id
+    # latlng is a list of [lat, lng] pairs; gaps come through as null entries
+    latlng_data = streams['latlng']['data'][:n]
+    latlng = np.full((n, 2), np.nan)
+    if latlng_data:
+        try:
+            latlng[:len(latlng_data)] = np.asarray(latlng_data, dtype=np.float64)
+        except (TypeError, ValueError):
+            latlng[:len(latlng_data)] = [pair if pair else (np.nan, np.nan) for pair in latlng_data]
     
-    # Use direct API calls instead of stravalib for more reliable authentication
-    headers = {"Authorization": f"Bearer {user.access_token}"}
+    velocity = _stream_values(streams, 'velocity_smooth', n)
+    # Distance along the GPS track; rides without any fix integrate speed over each time step
+    if np.isnan(latlng).all():
+        distance = np.cumsum(np.nan_to_num(velocity) * np.diff(t, prepend=t[0]))
+    else:
+        distance = cumulative_distance(latlng[:, 0], latlng[:, 1])
+    moving = np.zeros(n, dtype=bool)
+    if 'moving' in streams:
+        moving_data = streams['moving']['data'][:n]
+        moving[:len(moving_data)] = np.asarray(moving_data, dtype=bool)
     
-    # Get activity details
-    activity_url = f"https://www.strava.com/api/v3/activities/{strava_activity_id}"
-    response = requests.get(activity_url, headers=headers)
+    frame = pd.DataFrame({
+        "timestamp": pd.to_datetime(t + start_epoch, unit="s", utc=True),
+        "lat": latlng[:, 0],
+        "lon": latlng[:, 1],
+        "altitude": _stream_values(streams, 'altitude', n),
+        "distance": distance,
+        "velocity_smooth": velocity,
+        "heartrate": _stream_values(streams, 'heartrate', n),
+        "cadence": _stream_values(streams, 'cadence', n),
+        "watts": _stream_values(streams, 'watts', n),
+        "temp": _stream_values(streams, 'temp', n),
+        "moving": moving,
+        "grade_smooth": _stream_values(streams, 'grade_smooth', n),
+    })
+    return frame.astype(STREAM_DTYPES)
+
+
+def _uuid7_hex(n: int) -> np.ndarray:
+    """
+    n ascending UUIDv7 values (32 hex digits) stamped with the current time
+    Generated in one batch from a single os.urandom call instead of a uuid4() per row
+    """
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    # 48-bit big-endian Unix ms timestamp, then version 7 and the RFC 4122 variant bits
+    now_ms = np.array([time.time_ns() // 1_000_000], dtype=">u8")
+    raw[:, :6] = now_ms.view(np.uint8)[2:]
+    raw[:, 6] = 0x70 | (raw[:, 6] & 0x0F)
+    raw[:, 8] = 0x80 | (raw[:, 8] & 0x3F)
+    # Sorted so the batch itself also arrives in key order
+    return np.sort(np.frombuffer(raw.tobytes().hex().encode(), dtype="S32").astype("U32"))
+
+
+STREAM_COPY_SQL = (
+    f"COPY streams (id, activity_id, timestamp, {', '.join(STREAM_DTYPES)}) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+
+def _copy_streams(db: Session, activity_id: uuid.UUID, frame: pd.DataFrame) -> None:
+    """
+    Write a stream frame into the streams table with COPY on the session's own connection
+    """
+    # streams.moving is an integer column; the frame never holds NA here, so cast straight to 0/1
+    rows = frame.assign(moving=frame["moving"].to_numpy(dtype=np.uint8))
+    rows.insert(0, "activity_id", str(activity_id))
+    # Stamped with the insert time, not the sample time, so even backfilled rides land on the
+    # right-hand edge of the primary key index
+    rows.insert(0, "id", _uuid7_hex(len(frame)))
+    buf = io.StringIO()
+    rows.to_csv(buf, header=False, index=False)
+    buf.seek(0)
     
-    if response.status_code != 200:
-        logger.error(f"Error fetching activity {strava_activity_id}: {response.text}")
-        raise Exception(f"Failed to fetch activity: {response.text}")
-        
-    strava_activity = response.json()
+    # Runs inside the session's transaction, so it commits or rolls back with the activity row
+    with db.connection().connection.cursor() as cursor:
+        cursor.copy_expert(STREAM_COPY_SQL, buf)
+
+
+def find_activity_id(db: Session, strava_activity_id: int) -> Optional[uuid.UUID]:
+    """
+    Our UUID for a Strava activity, or None; one probe on the unique strava_id index
+    """
+    return db.execute(
+        select(Activity.id).where(Activity.strava_id == strava_activity_id).limit(1)
+    ).scalar()
+
+
+# Fields of an activity summary (from /athlete/activities) that we store on Activity
+SUMMARY_FIELDS = ('name', 'start_date', 'distance', 'moving_time',
+                  'total_elevation_gain', 'average_watts', 'average_heartrate')
+# Without these the summary can't stand in for the detail response
+REQUIRED_SUMMARY_FIELDS = ('name', 'start_date', 'distance', 'moving_time')
+
+def activity_summary(activity: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The subset of a listed activity that fetch_and_store_activity needs, small enough to pass to a task
+    """
+    return {field: activity[field] for field in SUMMARY_FIELDS if field in activity}
+
+
+# Built once at import so every ingest reuses the same statement and its compiled form.
+# A concurrent fetch of the same activity waits on the strava_id unique index and then
+# inserts nothing instead of raising.
+ACTIVITY_INSERT = (
+    pg_insert(Activity)
+    .on_conflict_do_nothing(index_elements=[Activity.strava_id])
+    .returning(Activity.id)
+)
+
+
+def fetch_and_store_activity(db: Session, user: User, strava_activity_id: int,
+                             trigger_recalc: bool = True,
+                             summary: Optional[Dict[str, Any]] = None) -> Optional[uuid.UUID]:
+    """
+    Fetch a single activity from Strava and store in database for an already loaded user
+    Returns the UUID of the created activity
+    Set trigger_recalc=False when the caller dispatches analytics itself (bulk sync)
+    Pass the activity's summary from the activity list to skip the detail request
+    """
+    # Check if activity already exists before any other work (webhook redeliveries land here)
+    existing_id = find_activity_id(db, strava_activity_id)
+    if existing_id:
+        logger.info(f"Activity {strava_activity_id} already exists, skipping")
+        return existing_id
     
-    # Create new activity from the API response
-    new_activity = Activity(
-        id=uuid.uuid4(),
-        user_id=user.id,
-        strava_id=strava_activity_id,
-        name=strava_activity['name'],
-        start_time=dt.datetime.fromisoformat(strava_activity['start_date']),
-        distance_m=float(strava_activity['distance']),
-        moving_time_s=strava_activity['moving_time'],
-        elev_gain_m=float(strava_activity['total_elevation_gain']) if strava_activity.get('total_elevation_gain') else None,
-        avg_power=float(strava_activity['average_watts']) if strava_activity.get('average_watts') else None,
-        avg_hr=float(strava_activity['average_heartrate']) if strava_activity.get('average_heartrate') else None,
-    )
+    # Use direct API calls instead of stravalib for more reliable authentication
+    headers = bearer_headers(get_access_token(user.id))
     
-    db.add(new_activity)
-    db.flush()  # Get ID without committing
+    if summary and all(field in summary for field in REQUIRED_SUMMARY_FIELDS):
+        # The listing already gave us every column we store
+        strava_activity = summary
+    else:
+        # Get activity details
+        activity_url = f"https://www.strava.com/api/v3/activities/{strava_activity_id}"
+        status_code, content = _strava_get_cached(_response_cache_key(strava_activity_id, "activity"), activity_url, headers)
+        
+        if status_code >= 500:
+            # Strava-side outage: a RequestException, so the batch task retries it
+            raise requests.HTTPError(f"Strava returned {status_code} for activity {strava_activity_id}")
+        if status_code != 200:
+            logger.error(f"Error fetching activity {strava_activity_id}: {content!r}")
+            raise Exception(f"Failed to fetch activity: {content!r}")
+            
+        strava_activity = orjson.loads(content)
+    # Parsed once; stream timestamps are built from the epoch seconds in one vectorized step
+    start_time = dt.datetime.fromisoformat(strava_activity['start_date'])
     
-    # Get streams data
+    # Get streams data first, so the activity row and its samples are written together
+    frame = None
+    np_watts = None
     try:
         streams_url = f"https://www.strava.com/api/v3/activities/{strava_activity_id}/streams"
         params = {
@@ -93,85 +366,124 @@ def fetch_and_store_activity(db: Session, user_id: str, strava_activity_id: int)
             'key_by_type': True
         }
         
-        streams_response = requests.get(streams_url, headers=headers, params=params)
+        streams_status, streams_content = _strava_get_cached(
+            _response_cache_key(strava_activity_id, "streams"), streams_url, headers, params
+        )
         
-        if streams_response.status_code == 200:
-            streams = streams_response.json()
+        if streams_status == 200:
+            streams = orjson.loads(streams_content)
             
-            # Process each stream type
-            if streams:
-                # Create stream entries
-                stream_objects = []
-                
-                # Get the time stream which is required
-                if 'time' in streams and 'latlng' in streams:
-                    time_data = streams['time']['data']
-                    latlng_data = streams['latlng']['data']
-                    
-                    # Optional streams
-                    altitude_data = streams['altitude']['data'] if 'altitude' in streams else [None] * len(time_data)
-                    heartrate_data = streams['heartrate']['data'] if 'heartrate' in streams else [None] * len(time_data)
-                    watts_data = streams['watts']['data'] if 'watts' in streams else [None] * len(time_data)
-                    cadence_data = streams['cadence']['data'] if 'cadence' in streams else [None] * len(time_data)
-                    velocity_data = streams['velocity_smooth']['data'] if 'velocity_smooth' in streams else [None] * len(time_data)
-                    temp_data = streams['temp']['data'] if 'temp' in streams else [None] * len(time_data)
-                    moving_data = streams['moving']['data'] if 'moving' in streams else [None] * len(time_data)
-                    grade_data = streams['grade_smooth']['data'] if 'grade_smooth' in streams else [None] * len(time_data)
-                    
-                    # Calculate start time
-                    start_time = dt.datetime.fromisoformat(strava_activity['start_date'])
-                    
-                    # Generate stream entries
-                    for i in range(len(time_data)):
-                        # Calculate timestamp
-                        timestamp = start_time + dt.timedelta(seconds=time_data[i])
-                        
-                        # Get lat/lng
-                        lat, lng = latlng_data[i] if i < len(latlng_data) and latlng_data[i] else (None, None)
-                        
-                        # Convert moving boolean to integer (0/1)
-                        moving_int = 1 if moving_data and i < len(moving_data) and moving_data[i] else 0
-                        
-                        stream_objects.append(
-                            Stream(
-                                id=uuid.uuid4(),
-                                activity_id=new_activity.id,
-                                timestamp=timestamp,
-                                lat=lat,
-                                lon=lng,
-                                altitude=altitude_data[i] if i < len(altitude_data) else None,
-                                distance=time_data[i] * (velocity_data[i] if i < len(velocity_data) and velocity_data[i] is not None else 0),
-                                velocity_smooth=velocity_data[i] if i < len(velocity_data) else None,
-                                heartrate=heartrate_data[i] if i < len(heartrate_data) else None,
-                                cadence=cadence_data[i] if i < len(cadence_data) else None,
-                                watts=watts_data[i] if i < len(watts_data) else None,
-                                temp=temp_data[i] if i < len(temp_data) else None,
-                                moving=moving_int,  # Use the integer value instead of boolean
-                                grade_smooth=grade_data[i] if i < len(grade_data) else None,
-                            )
-                        )
-                    
-                    # Batch insert streams (more efficient for large datasets)
-                    if stream_objects:
-                        db.bulk_save_objects(stream_objects)
+            # The time stream is required; everything else is optional
+            if streams and 'time' in streams and 'latlng' in streams:
+                frame = _build_stream_frame(streams, int(start_time.timestamp()))
+                if not len(frame):
+                    frame = None
+                elif 'watts' in streams:
+                    np_watts = normalized_power(frame['watts'].to_numpy(dtype=np.float64, na_value=np.nan))
+        elif streams_status >= 500:
+            raise requests.HTTPError(f"Strava returned {streams_status} for activity {strava_activity_id} streams")
         else:
-            logger.warning(f"Could not fetch streams: {streams_response.status_code} - {streams_response.text}")
+            logger.warning(f"Could not fetch streams: {streams_status} - {streams_content!r}")
+    except (StravaRateLimited, requests.RequestException):
+        # Don't store a ride without its streams; the caller retries the whole fetch
+        raise
     except Exception as e:
         logger.error(f"Error fetching streams for activity {strava_activity_id}: {e}")
     
+    # Create new activity from the API response
+    activity_id = uuid.uuid4()
+    activity_row = {
+        'id': activity_id,
+        'user_id': user.id,
+        'strava_id': strava_activity_id,
+        'name': strava_activity['name'],
+        'start_time': start_time,
+        'distance_m': float(strava_activity['distance']),
+        'moving_time_s': strava_activity['moving_time'],
+        'elev_gain_m': float(strava_activity['total_elevation_gain']) if strava_activity.get('total_elevation_gain') else None,
+        'avg_power': float(strava_activity['average_watts']) if strava_activity.get('average_watts') else None,
+        'avg_hr': float(strava_activity['average_heartrate']) if strava_activity.get('average_heartrate') else None,
+        'np': np_watts,
+    }
+    
+    # Activity row, stream COPY and blob commit as one transaction without waiting for the WAL
+    # flush; Strava is the source of truth, so a commit lost in a crash is simply re-synced
+    db.execute(text("SET LOCAL synchronous_commit = OFF"))
+    if db.execute(ACTIVITY_INSERT, activity_row).scalar() is None:
+        db.rollback()
+        logger.info(f"Activity {strava_activity_id} was stored by another worker, skipping")
+        return find_activity_id(db, strava_activity_id)
+    
+    if frame is not None:
+        # Bulk load the rows with COPY instead of one ORM object per sample
+        _copy_streams(db, activity_id, frame)
+        
+        # Also keep a columnar copy of the whole ride for analytics reads
+        db.add(ActivityStreamBlob(activity_id=activity_id, arrow_ipc=encode_streams(frame)))
+    
     # Commit changes
     db.commit()
     
     # Trigger analytics recalculation
-    recalc_metrics_for_activity.delay(str(user.id), strava_activity_id)
+    if trigger_recalc:
+        recalc_metrics_for_activity.delay(str(user.id), strava_activity_id)
     
-    return new_activity.id
+    return activity_id
+
+
+ACTIVITIES_URL = "https://www.strava.com/api/v3/athlete/activities"
+ACTIVITIES_PER_PAGE = 50
+PAGES_PER_WAVE = 4  # concurrent page requests; also bounds quota spent past the last page
+
+async def _get_activities_page(client: httpx.AsyncClient, after_timestamp: int, page: int) -> List[Dict[str, Any]]:
+    # The rate limiter talks to Redis synchronously; keep it off the loop so pages overlap
+    await asyncio.to_thread(ratelimit.acquire)
+    response = await client.get(ACTIVITIES_URL, params={
+        'after': after_timestamp,
+        'page': page,
+        'per_page': ACTIVITIES_PER_PAGE,
+    })
+    await asyncio.to_thread(ratelimit.record_usage, response.headers)
+    if response.status_code == 429:
+        raise StravaRateLimited(ratelimit.retry_after())
+    if response.status_code != 200:
+        logger.error(f"Failed to get activities: {response.text}")
+        raise ValueError(f"Failed to get Strava activities: {response.text}")
+    return orjson.loads(response.content)
 
 
-@celery.task
-def sync_initial_activities(user_id: str, days_back: int = 30):
+async def _list_rides(access_token: str, after_timestamp: int,
+                     max_activities: Optional[int] = None) -> List[Dict[str, Any]]:
     """
-    Synchronize a user's activities for the past X days
+    An athlete's ride summaries after a timestamp; other activity types are dropped page by page
+    Pages are fetched PAGES_PER_WAVE at a time over one HTTP/2 connection, until a short page
+    or until max_activities rides have been collected
+    """
+    rides = []
+    async with httpx.AsyncClient(headers=bearer_headers(access_token), http2=True) as client:
+        first_page = 1
+        while True:
+            pages = await asyncio.gather(*(
+                _get_activities_page(client, after_timestamp, page)
+                for page in range(first_page, first_page + PAGES_PER_WAVE)
+            ))
+            for activities_page in pages:
+                rides.extend(activity for activity in activities_page if activity['type'] == 'Ride')
+                if max_activities is not None and len(rides) >= max_activities:
+                    return rides[:max_activities]
+                # A page shorter than requested is the last one
+                if len(activities_page) < ACTIVITIES_PER_PAGE:
+                    return rides
+            first_page += PAGES_PER_WAVE
+
+
+@celery.task(bind=True, max_retries=None)
+def sync_initial_activities(self, user_id: str, days_back: int = 30, max_activities: Optional[int] = None):
+    """
+    Synchronize a user's rides for the past X days, optionally capped at max_activities
+    Lists the activities here and fans the per-activity fetches out to the fast workers
+    Routed to the prefork (slow) queue: the listing runs an asyncio loop, which doesn't mix
+    with eventlet's monkey patching
     """
     logger.info(f"Starting initial sync for user {user_id}, past {days_back} days")
     
@@ -181,82 +493,32 @@ def sync_initial_activities(user_id: str, days_back: int = 30):
         if not user:
             raise ValueError(f"User with ID {user_id} not found")
         
-        # Using a more direct way to get activities with proper authentication
-        # First, ensure we have a valid token by checking and refreshing if needed
-        if user.token_expires_at and user.token_expires_at <= dt.datetime.now() + dt.timedelta(minutes=5):
-            logger.info(f"Token for user {user_id} is expired or will expire soon, refreshing...")
-            
-            # Refresh the token using the Strava API directly
-            refresh_url = "https://www.strava.com/oauth/token"
-            refresh_data = {
-                'client_id': settings.STRAVA_CLIENT_ID,
-                'client_secret': settings.STRAVA_CLIENT_SECRET,
-                'refresh_token': user.refresh_token,
-                'grant_type': 'refresh_token'
-            }
-            
-            refresh_response = requests.post(refresh_url, data=refresh_data)
-            if refresh_response.status_code != 200:
-                logger.error(f"Failed to refresh token: {refresh_response.text}")
-                raise ValueError(f"Failed to refresh Strava token: {refresh_response.text}")
-            
-            token_data = refresh_response.json()
-            user.access_token = token_data['access_token']
-            user.refresh_token = token_data['refresh_token']
-            user.token_expires_at = dt.datetime.fromtimestamp(token_data['expires_at'])
-            db.commit()
-            logger.info(f"Successfully refreshed token for user {user_id}")
+        # Ensure we have a valid token, refreshing it if it expires soon
+        access_token = get_access_token(user_id)
         
         # Now get activities with the valid token
         after_date = dt.datetime.now() - dt.timedelta(days=days_back)
         after_timestamp = int(after_date.timestamp())
         
-        # Use direct API call instead of stravalib to have more control
-        activities_url = "https://www.strava.com/api/v3/athlete/activities"
-        headers = {"Authorization": f"Bearer {user.access_token}"}
+        # Strava paginates results; pages are requested concurrently in small waves
+        rides = asyncio.run(_list_rides(access_token, after_timestamp, max_activities))
         
-        # Strava paginates results, so we may need multiple requests
-        page = 1
-        per_page = 50
-        all_activities = []
-        
-        while True:
-            params = {
-                'after': after_timestamp,
-                'page': page,
-                'per_page': per_page
-            }
-            
-            response = requests.get(activities_url, headers=headers, params=params)
-            if response.status_code != 200:
-                logger.error(f"Failed to get activities: {response.text}")
-                raise ValueError(f"Failed to get Strava activities: {response.text}")
-            
-            activities_page = response.json()
-            all_activities.extend(activities_page)
-            
-            # Break if we got fewer results than requested (last page)
-            if len(activities_page) < per_page:
-                break
-            
-            page += 1
-        
-        activity_count = 0
-        for activity in all_activities:
-            # Skip activities that aren't rides
-            if activity['type'] != 'Ride':
-                continue
-            
-            try:
-                activity_id = activity['id']
-                fetch_and_store_activity(db, user_id, activity_id)
-                activity_count += 1
-            except Exception as e:
-                logger.error(f"Error syncing activity {activity['id']}: {e}")
+        # Fetch rides in parallel across workers, then rebuild analytics once when all are stored.
+        # Each task carries its ride's summary, so only the streams need fetching
+        if rides:
+            chord(
+                (enqueue_activity_fetch.s(user_id, ride['id'], trigger_recalc=False, summary=activity_summary(ride))
+                 for ride in rides),
+                recalc_metrics_for_user.si(user_id),
+            ).apply_async()
+        activity_count = len(rides)
         
-        logger.info(f"Completed initial sync for user {user_id}, synced {activity_count} activities")
+        logger.info(f"Initial sync for user {user_id} queued {activity_count} activities")
         return activity_count
         
+    except StravaRateLimited as e:
+        logger.info(f"Rate limited listing activities for user {user_id}, retrying in {e.retry_after}s")
+        raise self.retry(exc=e, countdown=e.retry_after)
     except Exception as e:
         logger.error(f"Error in initial sync for user {user_id}: {e}")
         raise
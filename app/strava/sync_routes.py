@@ -9,11 +9,14 @@ Responsibilities:
 - Return status information about sync operations
 """
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from app.db.session import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.session import get_db
 from app.db.models import User, Activity
 from app.strava.sync import sync_initial_activities, fetch_and_store_activity
+from app.strava.ratelimit import StravaRateLimited
 from typing import Optional
 import logging
 
@@ -23,6 +26,7 @@ logger = logging.getLogger(__name__)
 class SyncRequest(BaseModel):
     user_id: str
     days_back: int = 30
+    max_activities: Optional[int] = None
 
 
 class ActivitySyncRequest(BaseModel):
@@ -30,21 +34,21 @@ class ActivitySyncRequest(BaseModel):
     strava_activity_id: int
 
 
+# Plain def routes: the sync Session and the Strava fetch block, so FastAPI runs these
+# in its threadpool instead of on the event loop
 @router.post("/initial-sync")
-async def initial_sync(request: SyncRequest, background_tasks: BackgroundTasks):
+def initial_sync(request: SyncRequest, db: Session = Depends(get_db)):
     """
     Trigger initial synchronization of activities for a user
     """
-    # Verify user exists
-    db = SessionLocal()
-    user = db.query(User).filter(User.id == request.user_id).first()
-    db.close()
+    # Verify user exists (SELECT EXISTS, no row hydration)
+    user_exists = db.query(db.query(User).filter(User.id == request.user_id).exists()).scalar()
     
-    if not user:
+    if not user_exists:
         raise HTTPException(status_code=404, detail=f"User with ID {request.user_id} not found")
     
     # Schedule sync task in the background
-    task = sync_initial_activities.delay(request.user_id, request.days_back)
+    task = sync_initial_activities.delay(request.user_id, request.days_back, request.max_activities)
     
     return {
         "status": "started",
@@ -54,36 +58,42 @@ async def initial_sync(request: SyncRequest, background_tasks: BackgroundTasks):
 
 
 @router.post("/sync-activity")
-async def sync_activity(request: ActivitySyncRequest):
+def sync_activity(request: ActivitySyncRequest, db: Session = Depends(get_db)):
     """
     Sync a specific Strava activity
     """
-    db = SessionLocal()
     try:
-        # Check if user exists
-        user = db.query(User).filter(User.id == request.user_id).first()
-        if not user:
+        # Load the user and any existing copy of the activity in one round trip
+        row = db.execute(
+            select(User, Activity.id)
+            .select_from(User)
+            .outerjoin(Activity, Activity.strava_id == request.strava_activity_id)
+            .where(User.id == request.user_id)
+            .limit(1)
+        ).first()
+        if row is None:
             raise HTTPException(status_code=404, detail=f"User with ID {request.user_id} not found")
+        user, existing_id = row
         
-        # Check if activity already exists
-        existing = db.query(Activity).filter(Activity.strava_id == request.strava_activity_id).first()
-        if existing:
+        if existing_id:
             return {
                 "status": "exists",
                 "message": f"Activity {request.strava_activity_id} already exists",
-                "activity_id": str(existing.id)
+                "activity_id": str(existing_id)
             }
         
         # Fetch and store activity
-        activity_id = fetch_and_store_activity(db, request.user_id, request.strava_activity_id)
+        activity_id = fetch_and_store_activity(db, user, request.strava_activity_id)
         
         return {
             "status": "success",
             "message": f"Activity {request.strava_activity_id} synced successfully",
             "activity_id": str(activity_id)
         }
+    except HTTPException:
+        raise
+    except StravaRateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error syncing activity: {e}")
-        raise HTTPException(status_code=500, detail=f"Error syncing activity: {str(e)}")
-    finally:
-        db.close()
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error syncing activity: {str(e)}")
\ No newline at end of file
@@ -5,11 +5,14 @@ A simple script to test Strava API authentication and basic API access.
 This will help diagnose issues with the Strava API integration.
 """
 
-import requests
+import asyncio
 import datetime as dt
+import time
+import httpx
 from app.config import settings
 from app.db.session import SessionLocal
 from app.db.models import User
+from app.strava.client import bearer_headers
 import logging
 import json
 import sys
@@ -17,20 +20,20 @@ import sys
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def test_strava_auth():
+async def test_strava_auth():
     """
     Test Strava authentication and basic API access.
     This will:
     1. Get the latest user from the database
     2. Check their token
     3. Refresh the token if needed
-    4. Try to fetch athlete information
-    5. Try to list a few activities
+    4. Fetch athlete information and list a few activities concurrently
     """
     logger.info("Starting Strava API authentication test")
     
     # Connect to the database
     db = SessionLocal()
+    client = httpx.AsyncClient(http2=True, timeout=10.0)
     try:
         # Get the most recently authenticated user
         user = db.query(User).order_by(User.token_expires_at.desc()).first()
@@ -43,8 +46,8 @@ def test_strava_auth():
         logger.info(f"Strava athlete ID: {user.strava_athlete_id}")
         logger.info(f"Token expires at: {user.token_expires_at}")
         
-        # Check if token needs refreshing
-        if user.token_expires_at and user.token_expires_at <= dt.datetime.now() + dt.timedelta(minutes=5):
+        # Check if token needs refreshing (epoch seconds, same rule as app.strava.client)
+        if user.token_expires_at and user.token_expires_at.timestamp() - time.time() < 300:
             logger.info("Token is expired or will expire soon, refreshing...")
             
             refresh_url = "https://www.strava.com/oauth/token"
@@ -66,7 +69,7 @@ def test_strava_auth():
                 logger.error("Refresh token is missing")
                 return False
                 
-            refresh_response = requests.post(refresh_url, data=refresh_data)
+            refresh_response = await client.post(refresh_url, data=refresh_data)
             
             if refresh_response.status_code != 200:
                 logger.error(f"Failed to refresh token: {refresh_response.status_code}")
@@ -82,12 +85,20 @@ def test_strava_auth():
         else:
             logger.info("Token is still valid, no refresh needed")
         
-        # Try to get athlete information
-        logger.info("Testing API access - fetching athlete information")
+        # The athlete and activities reads are independent, so issue them together
+        logger.info("Testing API access - fetching athlete information and recent activities")
         athlete_url = "https://www.strava.com/api/v3/athlete"
-        headers = {"Authorization": f"Bearer {user.access_token}"}
+        activities_url = "https://www.strava.com/api/v3/athlete/activities"
+        headers = bearer_headers(user.access_token)
+        params = {
+            'per_page': 3,  # Just get a few activities
+            'page': 1
+        }
         
-        athlete_response = requests.get(athlete_url, headers=headers)
+        athlete_response, activities_response = await asyncio.gather(
+            client.get(athlete_url, headers=headers),
+            client.get(activities_url, headers=headers, params=params),
+        )
         
         if athlete_response.status_code != 200:
             logger.error(f"Failed to get athlete info: {athlete_response.status_code}")
@@ -97,16 +108,6 @@ def test_strava_auth():
         athlete_data = athlete_response.json()
         logger.info(f"Successfully fetched athlete info for: {athlete_data.get('firstname')} {athlete_data.get('lastname')}")
         
-        # Try to list some activities
-        logger.info("Testing API access - listing recent activities")
-        activities_url = "https://www.strava.com/api/v3/athlete/activities"
-        params = {
-            'per_page': 3,  # Just get a few activities
-            'page': 1
-        }
-        
-        activities_response = requests.get(activities_url, headers=headers, params=params)
-        
         if activities_response.status_code != 200:
             logger.error(f"Failed to get activities: {activities_response.status_code}")
             logger.error(f"Response: {activities_response.text}")
@@ -126,8 +127,9 @@ def test_strava_auth():
         logger.error(f"Error in test: {e}")
         return False
     finally:
+        await client.aclose()
         db.close()
 
 if __name__ == "__main__":
-    success = test_strava_auth()
+    success = asyncio.run(test_strava_auth())
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+test_sync.py
+------------
+Checks for the pure helpers in app.strava.sync.
+"""
+
+import time
+import uuid
+import numpy as np
+from app.strava.sync import _uuid7_hex
+
+
+def test_uuid7_layout():
+    before_ms = time.time_ns() // 1_000_000
+    ids = _uuid7_hex(1000)
+    after_ms = time.time_ns() // 1_000_000
+
+    assert ids.shape == (1000,)
+    assert len(set(ids)) == 1000
+    for value in ids[:50]:
+        parsed = uuid.UUID(value)
+        assert parsed.version == 7
+        assert parsed.variant == uuid.RFC_4122
+        # 48-bit big-endian Unix ms timestamp prefix
+        assert before_ms <= int(value[:12], 16) <= after_ms
+
+
+def test_uuid7_batch_is_ascending():
+    ids = _uuid7_hex(500)
+    assert (ids[1:] > ids[:-1]).all()
+    # The text order COPY sees is the same as the UUIDs' binary order
+    as_bytes = [uuid.UUID(value).bytes for value in ids]
+    assert as_bytes == sorted(as_bytes)
+
+
+def test_uuid7_later_batches_sort_after():
+    first = _uuid7_hex(10)
+    time.sleep(0.002)
+    second = _uuid7_hex(10)
+    assert first[-1] < second[0]
+
+
+def test_uuid7_empty_batch():
+    assert _uuid7_hex(0).size == 0
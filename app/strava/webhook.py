@@ -9,31 +9,148 @@ Responsibilities:
 - Used by Strava to notify of new activities.
 """
 
-from fastapi import APIRouter, Request, Depends, HTTPException, Body
-from fastapi.responses import PlainTextResponse, JSONResponse, Response
-from sqlalchemy.orm import Session  # Added missing import
-from app.db.session import SessionLocal
+from fastapi import APIRouter, Request, HTTPException, Body, Query
+from fastapi.responses import PlainTextResponse, ORJSONResponse, Response
+from sqlalchemy import select
+from app.db.session import AsyncSessionLocal
 from app.db.models import User
-from app.strava.sync import enqueue_activity_fetch
+from app.db.redis_client import redis_client
+from app.strava.sync import enqueue_activity_fetch, invalidate_cached_activity
 from app.config import settings
+from celery import group
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+from typing import Optional, List, Tuple, Dict
+import asyncio
 import hmac
 import hashlib
 import logging
-import json
+import orjson
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Helper function to get a database session
-def get_db():
-    db = SessionLocal()
+# strava_athlete_id -> our user id; the mapping only changes when an athlete deauthorizes
+_ATHLETE_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=600)
+
+# Cache misses arriving within this window are resolved together with one IN (...) query
+ATHLETE_LOOKUP_DELAY = 0.005
+ATHLETE_LOOKUP_MAX_BATCH = 100
+_athlete_waiters: Dict[int, List[asyncio.Future]] = {}
+_athlete_flush: Optional[asyncio.TimerHandle] = None
+_athlete_tasks: set = set()  # the loop only holds weak references to tasks
+
+def _start_athlete_resolve() -> None:
+    task = asyncio.get_running_loop().create_task(_resolve_athletes())
+    _athlete_tasks.add(task)
+    task.add_done_callback(_athlete_tasks.discard)
+
+async def _resolve_athletes() -> None:
+    global _athlete_flush
+    _athlete_flush = None
+    waiters = dict(_athlete_waiters)
+    _athlete_waiters.clear()
+    athlete_ids = list(waiters)
+    try:
+        found: Dict[int, str] = {}
+        async with AsyncSessionLocal() as db:
+            for i in range(0, len(athlete_ids), ATHLETE_LOOKUP_MAX_BATCH):
+                result = await db.execute(
+                    select(User.strava_athlete_id, User.id)
+                    .where(User.strava_athlete_id.in_(athlete_ids[i:i + ATHLETE_LOOKUP_MAX_BATCH]))
+                )
+                found.update((athlete_id, str(user_id)) for athlete_id, user_id in result)
+    except Exception as e:
+        for futures in waiters.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        return
+    _ATHLETE_CACHE.update(found)
+    for athlete_id, futures in waiters.items():
+        for future in futures:
+            if not future.done():
+                future.set_result(found.get(athlete_id))
+
+async def _user_id_for_athlete(strava_athlete_id: int) -> Optional[str]:
+    """
+    Map a Strava athlete ID to our internal user ID, from the cache when possible
+    """
+    global _athlete_flush
+    user_id = _ATHLETE_CACHE.get(strava_athlete_id)
+    if user_id is not None:
+        return user_id
+    
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _athlete_waiters.setdefault(strava_athlete_id, []).append(future)
+    if _athlete_flush is None:
+        _athlete_flush = loop.call_later(ATHLETE_LOOKUP_DELAY, _start_athlete_resolve)
+    return await future
+
+# Strava retries deliveries it thinks failed; remember create events for an hour
+WEBHOOK_SEEN_PREFIX = "wh:seen:"
+WEBHOOK_SEEN_TTL = 3600
+
+def _first_delivery(strava_activity_id: int) -> bool:
+    """
+    Claim a create event; False when this activity was already queued recently.
+    Blocking Redis call: run it off the event loop.
+    """
+    try:
+        return bool(redis_client.set(f"{WEBHOOK_SEEN_PREFIX}{strava_activity_id}", 1, nx=True, ex=WEBHOOK_SEEN_TTL))
+    except RedisError as e:
+        # Fail open: a duplicate fetch is cheaper than a dropped activity
+        logger.warning(f"Webhook dedup unavailable: {e}")
+        return True
+
+# Events arriving within this window go to the broker in one group publish
+WEBHOOK_FLUSH_DELAY = 0.01
+_pending_fetches: List[Tuple[str, int]] = []
+_flush_handle: Optional[asyncio.TimerHandle] = None
+
+def _publish_fetches(batch: List[Tuple[str, int]]) -> None:
     try:
-        yield db
-    finally:
-        db.close()
+        group(enqueue_activity_fetch.s(user_id, activity_id) for user_id, activity_id in batch).apply_async()
+        logger.info(f"Queued {len(batch)} activity fetch(es)")
+    except Exception as e:
+        logger.error(f"Failed to queue {len(batch)} activity fetch(es): {e}", exc_info=True)
+        # Release the dedup claims so Strava's retry can get through
+        try:
+            redis_client.delete(*(f"{WEBHOOK_SEEN_PREFIX}{activity_id}" for _, activity_id in batch))
+        except RedisError:
+            pass
+
+def _flush_pending_fetches() -> None:
+    global _flush_handle
+    _flush_handle = None
+    batch = _pending_fetches[:]
+    _pending_fetches.clear()
+    # Publishing is blocking socket I/O; keep it off the event loop
+    asyncio.get_running_loop().run_in_executor(None, _publish_fetches, batch)
+
+def _queue_activity_fetch(user_id: str, strava_activity_id: int) -> None:
+    """
+    Buffer a fetch and schedule a flush if one isn't already pending
+    """
+    global _flush_handle
+    _pending_fetches.append((user_id, strava_activity_id))
+    if _flush_handle is None:
+        _flush_handle = asyncio.get_running_loop().call_later(WEBHOOK_FLUSH_DELAY, _flush_pending_fetches)
 
-@router.get("/webhook")
-async def webhook_validation(request: Request):
+# The client secret signs event payloads and doubles as the subscription verify_token
+# (see webhook_manager.create_subscription). Encoded and keyed once at import; copying
+# the template skips the HMAC pad setup per request.
+_SECRET_BYTES = settings.STRAVA_CLIENT_SECRET.encode()
+_HMAC_TEMPLATE = hmac.new(_SECRET_BYTES, digestmod=hashlib.sha1)
+
+@router.get("/webhook", response_class=ORJSONResponse)
+async def webhook_validation(
+    request: Request,
+    hub_mode: Optional[str] = Query(None, alias="hub.mode"),
+    hub_challenge: Optional[str] = Query(None, alias="hub.challenge"),
+    hub_verify_token: Optional[str] = Query(None, alias="hub.verify_token"),
+):
     """
     Handle Strava webhook validation.
     
@@ -44,86 +161,104 @@ async def webhook_validation(request: Request):
     
     We must respond with a 200 OK and a JSON object: {"hub.challenge": challenge}
     """
-    # Log headers and query parameters
-    logger.info(f"--- Webhook Validation Request Start ---")
-    logger.info(f"Headers: {dict(request.headers)}")
-    logger.info(f"Query Params: {dict(request.query_params)}")
+    logger.debug("Headers: %s", request.headers)
     
-    # Extract the specific 'hub.challenge' parameter
-    challenge = request.query_params.get("hub.challenge")
-    
-    if challenge:
-        logger.info(f"Found hub.challenge: '{challenge}'")
-        logger.info(f"Returning challenge as JSON: {{'hub.challenge': '{challenge}'}}")
-        logger.info(f"--- Webhook Validation Request End ---")
-        # Return the challenge in the exact format Strava expects: {"hub.challenge": challenge}
-        return JSONResponse(content={"hub.challenge": challenge})
-    else:
+    if not hub_challenge:
         logger.warning("No 'hub.challenge' parameter found in the request.")
-        logger.info(f"--- Webhook Validation Request End ---")
         # Still return 200 OK even if no challenge, as Strava might ping it
-        return JSONResponse(content={"message": "Webhook endpoint ready, no challenge provided."})
+        return {"message": "Webhook endpoint ready, no challenge provided."}
+    
+    if hub_mode != "subscribe" or not hmac.compare_digest((hub_verify_token or "").encode(), _SECRET_BYTES):
+        logger.warning("Webhook validation with an invalid hub.mode or hub.verify_token")
+        raise HTTPException(status_code=403, detail="Invalid verify token")
+    
+    logger.info("Answering webhook validation challenge %r", hub_challenge)
+    # Strava's subscription spec asks for the challenge echoed back as JSON, not plain text
+    return {"hub.challenge": hub_challenge}
 
 @router.post("/webhook")
-async def webhook_event(req: Request, db: Session = Depends(get_db)):
+async def webhook_event(req: Request):
     """
     Handles Strava webhook events (new activities, deleted activities, etc.)
     """
-    # Get the request body as bytes for signature verification
+    # Read the raw bytes once: they feed both the signature check and the parse
     body_bytes = await req.body()
-    body = await req.json()
     
-    logger.info(f"Received webhook event: {body}")
+    # We only act on activity events and athlete deauthorizations; skip the HMAC and
+    # parse for anything else (whitespace-agnostic, so only the quoted values are matched)
+    if b'"activity"' not in body_bytes and b'"authorized"' not in body_bytes:
+        logger.info("Ignoring event without an activity or authorization change")
+        return {"status": "ok", "ignored": True}
     
     # Verify X-Hub-Signature if present
     strava_signature = req.headers.get("X-Hub-Signature")
     if strava_signature:
-        computed_signature = hmac.new(
-            settings.STRAVA_CLIENT_SECRET.encode(),
-            body_bytes,
-            hashlib.sha1
-        ).hexdigest()
+        mac = _HMAC_TEMPLATE.copy()
+        mac.update(body_bytes)
         
-        if not hmac.compare_digest(f"sha1={computed_signature}", strava_signature):
-            logger.warning(f"Invalid signature: {strava_signature}")
+        # Compare the 20 raw digest bytes rather than building and matching "sha1=<hex>"
+        prefix, _, hex_signature = strava_signature.partition("=")
+        try:
+            signature = bytes.fromhex(hex_signature)
+        except ValueError:
+            signature = b""
+        if prefix != "sha1" or not hmac.compare_digest(mac.digest(), signature):
+            logger.warning("Invalid signature: %s", strava_signature)
             raise HTTPException(status_code=403, detail="Invalid signature")
         
-        logger.info("Signature verification passed")
+        logger.debug("Signature verification passed")
     else:
         logger.warning("No X-Hub-Signature header present")
     
+    body = orjson.loads(body_bytes)
+    logger.debug("Received webhook event: %s", body)
+    
     # Process webhook event
     try:
         if body.get("aspect_type") == "create" and body.get("object_type") == "activity":
             strava_activity_id = body["object_id"]
             strava_athlete_id = body["owner_id"]
             
-            logger.info(f"Processing new activity: {strava_activity_id} from athlete: {strava_athlete_id}")
+            logger.info("Processing new activity: %s from athlete: %s", strava_activity_id, strava_athlete_id)
             
             # Map Strava athlete ID to our internal user ID
-            user = db.query(User).filter(User.strava_athlete_id == strava_athlete_id).first()
+            user_id = await _user_id_for_athlete(strava_athlete_id)
             
-            if user:
-                logger.info(f"Found matching user: {user.id}")
+            if user_id:
+                logger.debug("Found matching user: %s", user_id)
+                if not await asyncio.to_thread(_first_delivery, strava_activity_id):
+                    logger.info("Duplicate delivery for activity %s, skipping", strava_activity_id)
+                    return {"status": "ok", "deduped": True}
                 # Use our internal user ID for the task
-                enqueue_activity_fetch.delay(str(user.id), strava_activity_id)
+                _queue_activity_fetch(user_id, strava_activity_id)
                 return {"status": "ok", "message": f"Activity {strava_activity_id} queued for processing"}
             else:
-                logger.warning(f"No user found for Strava athlete ID: {strava_athlete_id}")
+                logger.warning("No user found for Strava athlete ID: %s", strava_athlete_id)
                 return {"status": "error", "message": f"No user found for Strava athlete ID: {strava_athlete_id}"}
         
+        # Athlete revoked access: forget the cached athlete -> user mapping
+        if body.get("object_type") == "athlete" and body.get("updates", {}).get("authorized") == "false":
+            _ATHLETE_CACHE.pop(body.get("owner_id"), None)
+            logger.info("Athlete %s deauthorized", body.get("owner_id"))
+            return {"status": "ok", "message": "Athlete deauthorized"}
+        
+        # Cached Strava responses for a changed or removed activity are stale now
+        if body.get("object_type") == "activity" and body.get("aspect_type") in ("update", "delete"):
+            await asyncio.to_thread(invalidate_cached_activity, body["object_id"])
+            logger.info("Invalidated cached Strava responses for activity %s", body["object_id"])
+            return {"status": "ok", "message": "Cached activity invalidated"}
+        
         # Log other event types but don't process them
-        logger.info(f"Ignoring event: {body.get('object_type')} / {body.get('aspect_type')}")
+        logger.info("Ignoring event: %s / %s", body.get("object_type"), body.get("aspect_type"))
         return {"status": "ok", "message": "Event ignored"}
     except Exception as e:
-        logger.error(f"Error processing webhook: {e}", exc_info=True)
+        logger.error("Error processing webhook: %s", e, exc_info=True)
         return {"status": "error", "message": str(e)}
 
 @router.post("/webhook-test")
 async def test_webhook_event(
     strava_activity_id: int = Body(...),
-    strava_athlete_id: int = Body(...),
-    db: Session = Depends(get_db)
+    strava_athlete_id: int = Body(...)
 ):
     """
     Test endpoint to simulate a Strava webhook event.
@@ -133,9 +268,9 @@ async def test_webhook_event(
     logger.info(f"Test webhook for activity {strava_activity_id} from athlete {strava_athlete_id}")
     
     # Map Strava athlete ID to our internal user ID
-    user = db.query(User).filter(User.strava_athlete_id == strava_athlete_id).first()
+    user_id = await _user_id_for_athlete(strava_athlete_id)
     
-    if not user:
+    if not user_id:
         logger.warning(f"No user found for Strava athlete ID: {strava_athlete_id}")
         raise HTTPException(
             status_code=404, 
@@ -143,12 +278,13 @@ async def test_webhook_event(
         )
     
     # Enqueue the activity fetch task
-    logger.info(f"Enqueueing activity {strava_activity_id} for user {user.id}")
-    task = enqueue_activity_fetch.delay(str(user.id), strava_activity_id)
+    logger.info(f"Enqueueing activity {strava_activity_id} for user {user_id}")
+    # The broker publish is blocking I/O; run it on a worker thread, not the event loop
+    task = await asyncio.to_thread(enqueue_activity_fetch.delay, user_id, strava_activity_id)
     
     return {
         "status": "ok",
         "message": f"Activity {strava_activity_id} queued for processing",
         "task_id": task.id,
-        "user_id": str(user.id)
+        "user_id": user_id
     }
\ No newline at end of file
@@ -15,6 +15,7 @@ Usage:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import sys
 import argparse
 from app.config import settings
@@ -22,6 +23,17 @@ from app.config import settings
 # Base URL for Strava Push Subscriptions API
 API_URL = "https://www.strava.com/api/v3/push_subscriptions"
 
+# Keep-alive session so consecutive calls reuse one TLS connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+_SESSION.headers["User-Agent"] = "AI-Bike-Coach webhook_manager"
+
+# App credentials sent with every list/delete call
+_BASE_PARAMS = {
+    'client_id': settings.STRAVA_CLIENT_ID,
+    'client_secret': settings.STRAVA_CLIENT_SECRET
+}
+
 def get_callback_url(ngrok_url=None):
     """
     Get the callback URL for the webhook.
@@ -62,7 +74,7 @@ def create_subscription(ngrok_url=None):
     print(f"Registering webhook with Strava...")
     print(f"Callback URL: {callback_url}")
     
-    response = requests.post(API_URL, data=payload)
+    response = _SESSION.post(API_URL, data=payload)
     
     if response.status_code == 200 or response.status_code == 201:
         print("Success! Webhook subscription created:")
@@ -75,12 +87,7 @@ def list_subscriptions():
     """
     List all active webhook subscriptions.
     """
-    params = {
-        'client_id': settings.STRAVA_CLIENT_ID,
-        'client_secret': settings.STRAVA_CLIENT_SECRET
-    }
-    
-    response = requests.get(API_URL, params=params)
+    response = _SESSION.get(API_URL, params=_BASE_PARAMS)
     
     if response.status_code == 200:
         subscriptions = response.json()
@@ -104,13 +111,8 @@ def delete_subscription(subscription_id):
     """
     Delete a specific webhook subscription.
     """
-    params = {
-        'client_id': settings.STRAVA_CLIENT_ID,
-        'client_secret': settings.STRAVA_CLIENT_SECRET
-    }
-    
     delete_url = f"{API_URL}/{subscription_id}"
-    response = requests.delete(delete_url, params=params)
+    response = _SESSION.delete(delete_url, params=_BASE_PARAMS)
     
     if response.status_code == 204:
         print(f"Successfully deleted subscription {subscription_id}")
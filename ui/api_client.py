@@ -0,0 +1,51 @@
+"""
+api_client.py
+-------------
+Shared HTTP access to the AI-Bike-Coach API for the Streamlit UI.
+
+Responsibilities:
+- Hold one keep-alive requests session for all UI calls to the API.
+- Cache status probes (health, root, user info) briefly so widget reruns don't re-hit the API.
+- Run independent probes in parallel so a page waits for the slowest one, not their sum.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+
+API_URL = "http://api:8000"
+PROBE_TIMEOUT = 2
+
+# One host; enough pooled keep-alive connections for probe_all's concurrent GETs
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+@lru_cache(maxsize=16)
+def _prepared(path: str) -> requests.PreparedRequest:
+    # Probe URLs are fixed, so URL parsing and header merging happen once per path
+    return SESSION.prepare_request(requests.Request("GET", f"{API_URL}{path}"))
+
+def _get(path: str):
+    try:
+        response = SESSION.send(_prepared(path), timeout=PROBE_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        return None, None, str(e)
+    return response.status_code, response.json() if response.status_code == 200 else None, None
+
+@st.cache_data(ttl=10, show_spinner=False)
+def probe_all(*paths: str):
+    """
+    GET several API paths concurrently; returns one (status_code, json_body, error) per path,
+    in order. status_code is None when the API could not be reached, and json_body is None
+    for non-200 responses. Cached for 10 s.
+    """
+    with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+        return list(pool.map(_get, paths))
+
+def probe(path: str):
+    """
+    Single-path probe_all.
+    """
+    return probe_all(path)[0]
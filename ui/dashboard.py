@@ -16,10 +16,8 @@ TODO:
 
 # dashboard.py: Dashboard tab with API health check
 import streamlit as st
-import requests
-import pandas as pd
 import json
-from datetime import datetime, timezone
+from api_client import SESSION, probe_all
 
 def show():
     st.header("Dashboard")
@@ -28,38 +26,38 @@ def show():
     st.subheader("System Status")
     col1, col2 = st.columns(2)
     
+    # Both checks and the user lookup below are independent; fire them together
+    (health_status, health_body, health_error), (root_status, root_body, root_error), user_probe = probe_all(
+        "/health", "/", "/auth/user-info"
+    )
+    
     with col1:
-        try:
-            response = requests.get("http://api:8000/health", timeout=2)
-            if response.status_code == 200:
-                st.success("✅ API is running")
-                st.json(response.json())
-            else:
-                st.error(f"❌ API returned status code {response.status_code}")
-        except requests.exceptions.RequestException as e:
-            st.error(f"❌ Cannot connect to API: {e}")
+        if health_status == 200:
+            st.success("✅ API is running")
+            st.json(health_body)
+        elif health_status is not None:
+            st.error(f"❌ API returned status code {health_status}")
+        else:
+            st.error(f"❌ Cannot connect to API: {health_error}")
     
     with col2:
-        try:
-            response = requests.get("http://api:8000/", timeout=2)
-            if response.status_code == 200:
-                st.success("✅ API root endpoint is accessible")
-                st.json(response.json())
-            else:
-                st.error(f"❌ API root endpoint returned status code {response.status_code}")
-        except requests.exceptions.RequestException as e:
-            st.error(f"❌ Cannot connect to API root: {e}")
+        if root_status == 200:
+            st.success("✅ API root endpoint is accessible")
+            st.json(root_body)
+        elif root_status is not None:
+            st.error(f"❌ API root endpoint returned status code {root_status}")
+        else:
+            st.error(f"❌ Cannot connect to API root: {root_error}")
     
     # Webhook Status Section
     st.subheader("Strava Webhook Status")
     
     # Try to fetch webhook subscriptions
     try:
-        # Get User Info (to get the Strava Athlete ID)
-        user_response = requests.get("http://api:8000/auth/user-info", timeout=2)
+        # User Info (to get the Strava Athlete ID), fetched alongside the status checks
+        user_status, user_info, _ = user_probe
         
-        if user_response.status_code == 200:
-            user_info = user_response.json()
+        if user_status == 200:
             strava_athlete_id = user_info.get('strava_athlete_id')
             
             st.info(f"Connected Strava account: Athlete ID {strava_athlete_id}")
@@ -79,7 +77,7 @@ def show():
                                 "strava_activity_id": int(activity_id),
                                 "strava_athlete_id": strava_athlete_id
                             }
-                            webhook_response = requests.post(
+                            webhook_response = SESSION.post(
                                 "http://api:8000/strava/webhook-test", 
                                 json=payload,
                                 timeout=5
@@ -99,7 +97,10 @@ def show():
     except Exception as e:
         st.error(f"❌ Error checking webhook status: {str(e)}")
     
-    # Placeholder for future dashboard components
+    # Placeholder for future dashboard components (off unless toggled on in the sidebar)
+    if not st.session_state.get("show_placeholders", False):
+        return
+    
     st.subheader("Coming Soon")
     st.info("Summary cards, CTL chart, PR list coming soon!")
     
@@ -112,4 +113,4 @@ def show():
         "Duration": ["1h 12m", "0h 48m", "2h 05m", "0h 45m"],
         "TSS": [65, 42, 95, 30]
     }
-    st.dataframe(pd.DataFrame(data))
+    st.dataframe(data)
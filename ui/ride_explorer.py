@@ -14,28 +14,217 @@ TODO:
 """
 import streamlit as st
 import requests
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import timedelta
 import json
+import pyarrow as pa
+from api_client import API_URL, SESSION, probe
+
+# Rides are recorded at ~1 Hz; a couple of thousand markers still trace the route faithfully
+MAP_MAX_POINTS = 2000
+# Stream columns the route map plots or shows on hover
+MAP_COLUMNS = ["lat", "lon", "altitude", "heartrate", "watts"]
+
+def thin_route(df: pd.DataFrame, max_points: int = MAP_MAX_POINTS) -> pd.DataFrame:
+    """
+    Evenly strided GPS samples (always keeping the last) so the map draws at most ~max_points markers
+    """
+    df = df.dropna(subset=["lat", "lon"])
+    step = -(-len(df) // max_points)
+    if step <= 1:
+        return df
+    return df.iloc[np.unique(np.r_[0:len(df):step, len(df) - 1])]
+
+def _with_unit(values: pd.Series, fmt: str) -> pd.Series:
+    """
+    Format a numeric column with a printf-style fmt; missing or zero values show as "N/A"
+    """
+    numbers = values.to_numpy(dtype=float, na_value=np.nan)
+    return pd.Series(np.char.mod(fmt, numbers), index=values.index).where(np.nan_to_num(numbers) != 0, "N/A")
+
+# ttl doesn't apply to disk-persisted caches, so bound the entry count instead
+STREAMS_CACHE_MAX_ENTRIES = 64
+
+@st.cache_data(persist="disk", max_entries=STREAMS_CACHE_MAX_ENTRIES, show_spinner=False)
+def _load_full_streams(activity_id: str) -> pd.DataFrame:
+    """
+    Fetch and parse all of an activity's streams. Stored streams never change, so the parsed
+    frame is persisted to disk and survives Streamlit restarts; keyed on the activity alone,
+    so there is one file per ride whatever the sampling slider is set to.
+    """
+    # Arrow IPC arrives already columnar and typed: no per-row JSON parsing
+    response = SESSION.get(
+        f"{API_URL}/activities/{activity_id}/streams.arrow", stream=True, timeout=5
+    )
+    if response.status_code != 404:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with response:  # return the pooled connection once the stream is read
+            df = pa.ipc.open_stream(response.raw).read_pandas()
+    else:
+        # Activities ingested before Arrow copies were stored only have the NDJSON endpoint
+        response.close()  # hand the connection back to the pool before reusing it
+        response = SESSION.get(
+            f"{API_URL}/activities/{activity_id}/streams", timeout=5
+        )
+        response.raise_for_status()
+        # The API streams one JSON object per line (NDJSON)
+        df = pd.DataFrame([json.loads(line) for line in response.iter_lines() if line])
+    if 'timestamp' in df.columns:
+        # Chart x-axis, computed once here so it is cached with the frame instead of on every rerun
+        ts = pd.to_datetime(df['timestamp'], utc=True, format="ISO8601").to_numpy(dtype="datetime64[ns]")
+        df['time_mins'] = (ts - ts[0]) / np.timedelta64(1, 'm')
+    return df
+
+def load_streams(activity_id: str, every: int = 1) -> pd.DataFrame:
+    """
+    An activity's streams keeping every Nth sample, sliced in memory from the cached full frame
+    """
+    df = _load_full_streams(activity_id)
+    return df if every == 1 else df.iloc[::every]
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def route_map(activity_id: str, every: int = 1):
+    """
+    Route map figure for an activity, built once and reused across reruns; None when the
+    ride has no GPS data. Plotly's figure builder walks every marker, so this is the costly part.
+    """
+    import plotly.express as px  # only needed once a ride with GPS is opened
+    
+    stream_df = load_streams(activity_id, every)
+    if not ('lat' in stream_df.columns and 'lon' in stream_df.columns and not stream_df['lat'].isna().all()):
+        return None
+    
+    # Only the map is thinned; the charts keep every sample.
+    # Selecting its columns first keeps the rest out of the copy and the plot payload.
+    map_df = thin_route(stream_df[[c for c in MAP_COLUMNS if c in stream_df.columns]])
+    fig = px.scatter_mapbox(
+        map_df, 
+        lat="lat", 
+        lon="lon", 
+        zoom=11,
+        color="watts" if "watts" in stream_df.columns and not stream_df['watts'].isna().all() else None,
+        hover_data={
+            "altitude": True if "altitude" in stream_df.columns else False,
+            "heartrate": True if "heartrate" in stream_df.columns else False,
+            "watts": True if "watts" in stream_df.columns else False
+        },
+        mapbox_style="open-street-map"
+    )
+    fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0}, height=500)
+    return fig
+
+@st.fragment
+def activity_details(activities_df: pd.DataFrame, activities_by_id: dict):
+    """
+    Activity picker plus the selected ride's metrics, map and charts. Runs as a fragment, so
+    picking another ride reruns only this section, not the health check and activity list above.
+    """
+    # Select an activity to explore in detail; labels are built once, not masked per option
+    labels = dict(zip(activities_df['id'], activities_df['name'] + " (" + activities_df['date'] + ")"))
+    selected_activity_id = st.selectbox(
+        "Select an activity to view details:", 
+        options=list(labels),
+        format_func=labels.__getitem__
+    )
+    
+    if selected_activity_id:
+        selected_activity = activities_by_id[selected_activity_id]
+    
+        st.subheader(f"Activity Details: {selected_activity['name']}")
+    
+        # Display activity metrics as one table: a single element instead of four metric widgets
+        st.dataframe({
+            "Distance": [f"{selected_activity['distance_m']/1000:.1f} km"],
+            "Elevation": [f"{selected_activity['elev_gain_m']:.0f} m" if selected_activity['elev_gain_m'] else "N/A"],
+            "Duration": [str(timedelta(seconds=int(selected_activity['moving_time_s']))) if selected_activity['moving_time_s'] else "N/A"],
+            "Avg Power": [f"{selected_activity['avg_power']:.0f} W" if selected_activity['avg_power'] else "N/A"],
+        }, hide_index=True, use_container_width=True)
+    
+        # Fewer samples means lighter charts on long rides; the full ride is fetched and cached once
+        every = st.slider("Sample every Nth point", 1, 50, 1)
+        
+        # Fetch stream data for the selected activity
+        try:
+            stream_df = load_streams(selected_activity_id, every)
+        except requests.exceptions.HTTPError as e:
+            st.warning(f"Could not fetch stream data: {e.response.status_code}")
+            stream_df = None
+        except requests.exceptions.RequestException as e:
+            st.error(f"Error fetching stream data: {e}")
+            stream_df = None
+    
+        if stream_df is not None:
+            if not stream_df.empty:
+                # Map visualization
+                st.subheader("Route Map")
+    
+                fig = route_map(selected_activity_id, every)
+                if fig is not None:
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.info("No GPS data available to display the route map.")
+    
+                # Power and HR charts
+                st.subheader("Power & Heart Rate")
+    
+                # Create a time axis in minutes
+                if 'time_mins' in stream_df.columns:
+    
+                    # WebGL traces: a multi-hour ride is tens of thousands of points per line
+                    fig = go.Figure()
+    
+                    # Add power data if available
+                    if 'watts' in stream_df.columns and not stream_df['watts'].isna().all():
+                        fig.add_trace(go.Scattergl(
+                            x=stream_df['time_mins'].to_numpy(),
+                            y=stream_df['watts'].to_numpy(),
+                            mode='lines',
+                            name='Power (watts)',
+                            line=dict(color='orange')
+                        ))
+    
+                    # Add heart rate data if available
+                    if 'heartrate' in stream_df.columns and not stream_df['heartrate'].isna().all():
+                        fig.add_trace(go.Scattergl(
+                            x=stream_df['time_mins'].to_numpy(),
+                            y=stream_df['heartrate'].to_numpy(),
+                            mode='lines',
+                            name='Heart Rate (bpm)',
+                            line=dict(color='red')
+                        ))
+    
+                    if 'watts' in stream_df.columns or 'heartrate' in stream_df.columns:
+                        fig.update_layout(
+                            xaxis_title='Time (minutes)',
+                            yaxis_title='Value',
+                            height=400,
+                            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
+                    else:
+                        st.info("No power or heart rate data available for this activity.")
+                else:
+                    st.info("No time series data available to create charts.")
+            else:
+                st.info("No stream data available for this activity.")
+
 
 def show():
     st.header("Ride Explorer")
     
     # API Health Check
     st.subheader("API Connection")
-    try:
-        response = requests.get("http://api:8000/health", timeout=2)
-        if response.status_code == 200:
-            st.success("✅ Connected to API")
-            api_healthy = True
-        else:
-            st.error(f"❌ API returned status code {response.status_code}")
-            api_healthy = False
-    except requests.exceptions.RequestException as e:
-        st.error(f"❌ Cannot connect to API: {e}")
-        api_healthy = False
+    status_code, _, error = probe("/health")
+    api_healthy = status_code == 200
+    if api_healthy:
+        st.success("✅ Connected to API")
+    elif status_code is not None:
+        st.error(f"❌ API returned status code {status_code}")
+    else:
+        st.error(f"❌ Cannot connect to API: {error}")
     
     if not api_healthy:
         st.warning("Cannot fetch activities from the database. Please ensure the API is running properly.")
@@ -47,7 +236,7 @@ def show():
     try:
         # In a real app, we would need user authentication here
         # For now, we'll just fetch all activities
-        response = requests.get("http://api:8000/activities", timeout=5)
+        response = SESSION.get(f"{API_URL}/activities", timeout=5)
         
         if response.status_code == 200:
             activities = response.json()
@@ -56,21 +245,25 @@ def show():
                 st.info("No activities found in the database. Try syncing with Strava first!")
                 return
                 
-            # Convert to DataFrame for display
-            activities_df = pd.DataFrame([
-                {
-                    'id': a['id'],
-                    'name': a['name'],
-                    'date': datetime.fromisoformat(a['start_time']).strftime('%Y-%m-%d'),
-                    'distance': f"{a['distance_m']/1000:.1f} km",
-                    'duration': str(timedelta(seconds=int(a['moving_time_s']))) if a['moving_time_s'] else "N/A",
-                    'elevation': f"{a['elev_gain_m']:.0f} m" if a['elev_gain_m'] else "N/A",
-                    'avg_power': f"{a['avg_power']:.0f} W" if a['avg_power'] else "N/A",
-                    'avg_hr': f"{a['avg_hr']:.0f} bpm" if a['avg_hr'] else "N/A",
-                    'raw_data': a
-                }
-                for a in activities
+            # O(1) lookup of the raw record for the selected activity
+            activities_by_id = {a['id']: a for a in activities}
+            
+            # Build the display table column-wise rather than formatting row by row
+            records = pd.DataFrame.from_records(activities, columns=[
+                'id', 'name', 'start_time', 'distance_m', 'moving_time_s', 'elev_gain_m', 'avg_power', 'avg_hr'
             ])
+            moving_s = records['moving_time_s'].fillna(0).astype(int)
+            activities_df = pd.DataFrame({
+                'id': records['id'],
+                'name': records['name'],
+                'date': pd.to_datetime(records['start_time'], format="ISO8601").dt.strftime('%Y-%m-%d'),
+                'distance': np.char.mod("%.1f km", records['distance_m'].to_numpy(dtype=float) / 1000),
+                'duration': ((moving_s // 3600).astype(str) + ":" + (moving_s % 3600 // 60).astype(str).str.zfill(2)
+                             + ":" + (moving_s % 60).astype(str).str.zfill(2)).where(moving_s > 0, "N/A"),
+                'elevation': _with_unit(records['elev_gain_m'], "%.0f m"),
+                'avg_power': _with_unit(records['avg_power'], "%.0f W"),
+                'avg_hr': _with_unit(records['avg_hr'], "%.0f bpm"),
+            })
             
             # Display activities list
             st.dataframe(
@@ -78,119 +271,7 @@ def show():
                 use_container_width=True
             )
             
-            # Select an activity to explore in detail
-            selected_activity_id = st.selectbox(
-                "Select an activity to view details:", 
-                options=activities_df['id'].tolist(),
-                format_func=lambda x: f"{activities_df[activities_df['id']==x]['name'].values[0]} ({activities_df[activities_df['id']==x]['date'].values[0]})"
-            )
-            
-            if selected_activity_id:
-                selected_activity = activities_df[activities_df['id'] == selected_activity_id]['raw_data'].values[0]
-                
-                st.subheader(f"Activity Details: {selected_activity['name']}")
-                
-                # Display activity metrics
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("Distance", f"{selected_activity['distance_m']/1000:.1f} km")
-                with col2:
-                    if selected_activity['elev_gain_m']:
-                        st.metric("Elevation", f"{selected_activity['elev_gain_m']:.0f} m")
-                    else:
-                        st.metric("Elevation", "N/A")
-                with col3:
-                    if selected_activity['moving_time_s']:
-                        st.metric("Duration", str(timedelta(seconds=int(selected_activity['moving_time_s']))))
-                    else:
-                        st.metric("Duration", "N/A")
-                with col4:
-                    if selected_activity['avg_power']:
-                        st.metric("Avg Power", f"{selected_activity['avg_power']:.0f} W")
-                    else:
-                        st.metric("Avg Power", "N/A")
-                
-                # Fetch stream data for the selected activity
-                try:
-                    stream_response = requests.get(f"http://api:8000/activities/{selected_activity_id}/streams", timeout=5)
-                    
-                    if stream_response.status_code == 200:
-                        streams = stream_response.json()
-                        
-                        if streams:
-                            # Convert stream data for visualization
-                            stream_df = pd.DataFrame(streams)
-                            
-                            # Map visualization
-                            st.subheader("Route Map")
-                            
-                            # Check if lat/lon data is available
-                            if 'lat' in stream_df.columns and 'lon' in stream_df.columns and not stream_df['lat'].isna().all():
-                                fig = px.scatter_mapbox(
-                                    stream_df, 
-                                    lat="lat", 
-                                    lon="lon", 
-                                    zoom=11,
-                                    color="watts" if "watts" in stream_df.columns and not stream_df['watts'].isna().all() else None,
-                                    hover_data={
-                                        "altitude": True if "altitude" in stream_df.columns else False,
-                                        "heartrate": True if "heartrate" in stream_df.columns else False,
-                                        "watts": True if "watts" in stream_df.columns else False
-                                    },
-                                    mapbox_style="open-street-map"
-                                )
-                                fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0}, height=500)
-                                st.plotly_chart(fig, use_container_width=True)
-                            else:
-                                st.info("No GPS data available to display the route map.")
-                            
-                            # Power and HR charts
-                            st.subheader("Power & Heart Rate")
-                            
-                            # Create a time axis in minutes
-                            if 'timestamp' in stream_df.columns:
-                                stream_df['time_mins'] = (pd.to_datetime(stream_df['timestamp']) - pd.to_datetime(stream_df['timestamp'].iloc[0])).dt.total_seconds() / 60
-                                
-                                fig = go.Figure()
-                                
-                                # Add power data if available
-                                if 'watts' in stream_df.columns and not stream_df['watts'].isna().all():
-                                    fig.add_trace(go.Scatter(
-                                        x=stream_df['time_mins'], 
-                                        y=stream_df['watts'],
-                                        mode='lines',
-                                        name='Power (watts)',
-                                        line=dict(color='orange')
-                                    ))
-                                
-                                # Add heart rate data if available
-                                if 'heartrate' in stream_df.columns and not stream_df['heartrate'].isna().all():
-                                    fig.add_trace(go.Scatter(
-                                        x=stream_df['time_mins'], 
-                                        y=stream_df['heartrate'],
-                                        mode='lines',
-                                        name='Heart Rate (bpm)',
-                                        line=dict(color='red')
-                                    ))
-                                
-                                if 'watts' in stream_df.columns or 'heartrate' in stream_df.columns:
-                                    fig.update_layout(
-                                        xaxis_title='Time (minutes)',
-                                        yaxis_title='Value',
-                                        height=400,
-                                        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-                                    )
-                                    st.plotly_chart(fig, use_container_width=True)
-                                else:
-                                    st.info("No power or heart rate data available for this activity.")
-                            else:
-                                st.info("No time series data available to create charts.")
-                        else:
-                            st.info("No stream data available for this activity.")
-                    else:
-                        st.warning(f"Could not fetch stream data: {stream_response.status_code}")
-                except requests.exceptions.RequestException as e:
-                    st.error(f"Error fetching stream data: {e}")
+            activity_details(activities_df, activities_by_id)
                     
         else:
             st.warning(f"Could not fetch activities: {response.status_code}")
@@ -16,17 +16,21 @@ TODO:
 
 # Placeholder for Streamlit UI multipage app
 import streamlit as st
-# Modified import statement for better compatibility within Docker container
-import dashboard, ride_explorer
 
 st.set_page_config(page_title="AI-Bike-Coach", layout="wide")
 
 st.sidebar.title("AI-Bike-Coach")
 page = st.sidebar.radio("Navigation", ["Dashboard", "Ride Explorer", "Chat"])
+# Mock/"coming soon" sections are dev aids; skip rendering them unless asked for
+st.sidebar.toggle("Show placeholders", value=False, key="show_placeholders")
 
+# Page modules are imported on first visit only; sys.modules makes later navigations free.
+# Plain (not ui.-prefixed) imports for compatibility within the Docker container.
 if page == "Dashboard":
+    import dashboard
     dashboard.show()
 elif page == "Ride Explorer":
+    import ride_explorer
     ride_explorer.show()
 else:
     st.header("Chat")